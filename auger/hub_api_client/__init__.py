@@ -1,2 +1,8 @@
 # -*- coding: utf-8 -*-
-from .hub_api_client import HubApiClient
\ No newline at end of file
+from .hub_api_client import HubApiClient
+from .async_hub_api_client import AsyncHubApiClient
+from .cache import ResponseCache, SQLiteResponseCache
+from .circuit_breaker import CircuitBreaker
+from .polling import ExponentialBackoff
+from .rate_limiter import AdaptiveConcurrency, RateLimiter
+from .retry import RetryBudget, RetryPolicy
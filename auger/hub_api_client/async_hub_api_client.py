@@ -0,0 +1,558 @@
+import asyncio
+import inspect
+import time
+
+from collections import deque
+from contextlib import asynccontextmanager
+
+try:
+    import aiohttp
+    import yarl
+except ImportError:
+    aiohttp = None
+
+from .hub_api_client import HubApiClient
+from .query import url_with_query
+from .single_flight import AsyncSingleFlight
+
+class AsyncHubApiClient(HubApiClient):
+    # Already read aiohttp response with requests.Response like interface,
+    # so response handling and error formatting is shared with HubApiClient
+    class Response:
+        def __init__(self, status_code, reason, content, headers, encoding=None):
+            self.status_code = status_code
+            self.reason = reason
+            self.content = content
+            self.headers = headers
+            self.encoding = encoding or 'utf-8'
+
+        def __str__(self):
+            return '<Response [{}]>'.format(self.status_code)
+
+        @property
+        def text(self):
+            return self.content.decode(self.encoding, errors='replace')
+
+    def __init__(self, **config):
+        if aiohttp is None:
+            raise ImportError('AsyncHubApiClient requires aiohttp, install it with `pip install auger-hub-api-client[async]`')
+
+        super().__init__(**config)
+
+    def __enter__(self):
+        raise TypeError('use `async with` for AsyncHubApiClient')
+
+    def __exit__(self, *args):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def build_coalescing(self):
+        return AsyncSingleFlight()
+
+    def build_session(self, base_url):
+        connector = aiohttp.TCPConnector(limit=self.pool_maxsize, force_close=not self.keep_alive)
+        return aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+
+    async def close(self):
+        with self.sessions_lock:
+            sessions = list(self.sessions.values())
+            self.sessions = {}
+
+        for session in sessions:
+            await session.close()
+
+    async def request(self, method_name, path, base_url, payload={}, gzip=False, headers=None):
+        params, headers = self.authorize(payload, headers)
+
+        full_path = self.full_path(relative_path=path, base_url=base_url)
+
+        if gzip:
+            data, body_headers = self.compressed_body(params)
+            kwargs = { 'data': self.async_body(data), 'headers': self.merge_headers(body_headers, headers) }
+        elif self.params_in_query(method_name):
+            # Query string is already encoded, so yarl doesn't quote it again
+            full_path = yarl.URL(url_with_query(full_path, params), encoded=True)
+            kwargs = { 'headers': self.merge_headers(self.headers, headers) }
+        else:
+            kwargs = { 'data': self.codec.dumps(params), 'headers': self.merge_headers(self.headers, headers) }
+
+        try:
+            async with self.session(base_url).request(method_name.upper(), full_path, **kwargs) as res:
+                content = await res.read()
+                return self.Response(res.status, res.reason, content, res.headers, res.charset)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            raise self.NetworkError(str(e))
+
+    # aiohttp streams bodies from async generators
+    def async_body(self, data):
+        if isinstance(data, bytes):
+            return data
+
+        async def body():
+            for chunk in data:
+                yield chunk
+
+        return body()
+
+    async def make_and_handle_request(self, method_name, path, base_url=None, payload={}, retry_counter=None, plain_text=False, gzip=False, resource_name=None, action_name=None):
+        if not base_url:
+            base_url = self.base_url
+
+        state = self.prepare_request_state(method_name, base_url, path, payload, resource_name, action_name)
+        if 'response' in state:
+            return state['response']
+
+        with_headers = 'validators_key' in state
+
+        async def request():
+            res = await self.request_with_retries(
+                method_name, path, base_url, payload, retry_counter, plain_text, gzip, state['headers'], resource_name,
+                with_headers=with_headers
+            )
+            res, headers = res if with_headers else (res, None)
+            return self.resolve_not_modified(state, res), headers
+
+        coalescing_key = self.coalescing_key(method_name, base_url, path, payload, plain_text, state['headers'])
+
+        if coalescing_key:
+            (res, headers), shared = await self.coalescing.do(coalescing_key, request)
+            if shared:
+                state.pop('validators_key', None)
+        else:
+            res, headers = await request()
+
+        return self.complete_request_state(state, method_name, resource_name, res, headers)
+
+    async def request_with_retries(self, method_name, path, base_url, payload={}, retry_counter=None, plain_text=False, gzip=False, headers=None, resource_name=None, with_headers=False):
+        if retry_counter is None:
+            retry_counter = self.default_retry_counter(method_name)
+
+        self.check_circuit(method_name, path, base_url, payload)
+
+        try:
+            self.log_request(method_name, path, payload)
+            with self.count_outcome(base_url):
+                async with self.limit_request(method_name, resource_name):
+                    res = await self.request(method_name, path, base_url, payload, gzip, headers)
+                    self.local.response_size = len(res.content)
+                    self.log_response(method_name, path, res)
+                    body = self.handle_response(res, plain_text=plain_text, conditional=self.is_conditional(headers))
+                    return (body, res.headers) if with_headers else body
+        except (self.RetryableApiError, self.NetworkError) as e:
+            try:
+                wait = retry_counter.retry_wait(e)
+            except self.RetryBudgetExhaustedError as budget_error:
+                e, wait = budget_error, None
+
+            if wait is not None:
+                await asyncio.sleep(wait)
+                return await self.request_with_retries(
+                    method_name, path, base_url, payload, retry_counter.count_retry(e), plain_text, gzip, headers, resource_name,
+                    with_headers=with_headers
+                )
+            else:
+                e.add_request_details(method_name, path, payload)
+                raise e
+        except self.BaseError as e:
+            e.add_request_details(method_name, path, payload)
+            raise e
+
+    @asynccontextmanager
+    async def limit_request(self, method_name, resource_name):
+        if self.rate_limiter is not None:
+            delay = self.rate_limiter.reserve(method_name, resource_name)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        if self.adaptive_concurrency is None:
+            yield
+            return
+
+        await self.adaptive_concurrency.acquire_async()
+        success = None
+
+        try:
+            yield
+            success = True
+        except self.RetryableApiError:
+            success = False
+            raise
+        finally:
+            self.adaptive_concurrency.release(success)
+
+    async def get_paginated_response(self, full_path, limit=HubApiClient.DEFAULT_PAGE_LIMIT, offset=0, parallel_workers=0, keep_order=True, dedupe=False, resource_name=None, retry_counter=None, **kwargs):
+        async def fetch_page(limit, offset):
+            args = { 'limit': limit, 'offset': offset }
+            args.update(kwargs)
+            return await self.get(full_path, args, resource_name=resource_name, action_name='index', retry_counter=retry_counter)
+
+        if parallel_workers > 0:
+            items = []
+            await self.shard_all_resource_pages(fetch_page, items.append, parallel_workers, limit, offset, keep_order, dedupe)
+            return self.merged_pages_response(items, offset)
+        else:
+            return await fetch_page(limit, offset)
+
+    # Same as HubApiClient.shard_all_resource_pages, at most `workers` pages are requested at once
+    async def shard_all_resource_pages(self, fetch_page, handler, workers, limit, offset=0, keep_order=True, dedupe=False):
+        seen_ids = set() if dedupe else None
+
+        async def handle_page(res):
+            for item in self.unseen_items(res['data'], seen_ids):
+                await self.handle_item(handler, item)
+
+        res = await fetch_page(limit, offset)
+        pagination = res['meta']['pagination']
+        await handle_page(res)
+
+        limit = pagination.get('limit', limit)
+        total = pagination.get('total')
+
+        if total is None:
+            while not self.is_last_page(pagination, offset, limit):
+                offset += pagination['count']
+                res = await fetch_page(limit, offset)
+                pagination = res['meta']['pagination']
+                await handle_page(res)
+
+            return
+
+        semaphore = asyncio.Semaphore(workers)
+        next_offset = offset + limit
+        pending = deque()
+
+        async def fetch_limited(offset):
+            async with semaphore:
+                return await fetch_page(limit, offset)
+
+        def schedule():
+            nonlocal next_offset
+            while len(pending) < workers * 2 and next_offset < total:
+                pending.append(asyncio.ensure_future(fetch_limited(next_offset)))
+                next_offset += limit
+
+        schedule()
+
+        try:
+            while pending:
+                if keep_order:
+                    task = pending.popleft()
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    task = next(iter(done))
+                    pending.remove(task)
+
+                res = await task
+                total = max(total, res['meta']['pagination'].get('total') or total)
+
+                await handle_page(res)
+                schedule()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # Handler can be a plain function or a coroutine function
+    async def handle_item(self, handler, item):
+        result = handler(item)
+        if inspect.isawaitable(result):
+            await result
+
+    async def iterate_all_resource_pages(self, method_name, handler, prefetch_pages=0, parallel_workers=0, keep_order=True, dedupe=False, **kwargs):
+        self.check_page_fetch_options(prefetch_pages, parallel_workers, kwargs)
+
+        if parallel_workers > 0:
+            method = getattr(self, method_name)
+            limit = kwargs.pop('limit', self.DEFAULT_PAGE_LIMIT)
+
+            async def fetch_page(limit, offset):
+                return await method(limit=limit, offset=offset, **kwargs)
+
+            return await self.shard_all_resource_pages(fetch_page, handler, parallel_workers, limit, 0, keep_order, dedupe)
+
+        if prefetch_pages > 0:
+            return await self.prefetch_all_resource_pages(method_name, handler, prefetch_pages, **kwargs)
+
+        async for item in self.stream_resource_items(method_name, **kwargs):
+            await self.handle_item(handler, item)
+
+    async def stream_resource_items(self, method_name, limit=HubApiClient.DEFAULT_PAGE_LIMIT, offset=0, adaptive=None, pagination='offset', **kwargs):
+        if pagination == 'cursor':
+            async for item in self.stream_resource_items_by_cursor(method_name, limit, **kwargs):
+                yield item
+            return
+
+        method = getattr(self, method_name)
+
+        if adaptive is True:
+            adaptive = self.AdaptivePageSize(limit=limit)
+
+        while True:
+            if adaptive:
+                limit = adaptive.limit
+                started_at = time.monotonic()
+
+                try:
+                    res = await method(limit=limit, offset=offset, retry_counter=self.adaptive_page_retry_counter(), **kwargs)
+                except self.RetryableApiError as e:
+                    if adaptive.record_error(e):
+                        continue
+                    res = await method(limit=limit, offset=offset, **kwargs)
+
+                adaptive.record(time.monotonic() - started_at, self.last_response_size())
+
+                if self.debug:
+                    print('HAC.Page: limit {} next limit {}'.format(limit, adaptive.limit))
+            else:
+                res = await method(limit=limit, offset=offset, **kwargs)
+
+            for item in res['data']:
+                yield item
+
+            pagination = res['meta']['pagination']
+
+            if self.is_last_page(pagination, offset, limit):
+                break
+
+            offset += pagination['count']
+
+    async def stream_resource_items_by_cursor(self, method_name, limit=HubApiClient.DEFAULT_PAGE_LIMIT, **kwargs):
+        method = getattr(self, method_name)
+
+        cursor_args = {}
+        previous_ids = set()
+        seen_count = 0
+
+        while True:
+            args = dict(kwargs, **cursor_args)
+            res = await method(limit=limit, **args)
+
+            data = res['data']
+            pagination = res['meta']['pagination']
+            ids = set(item.get('id') for item in data) - set([None])
+
+            if 'after_id' in cursor_args and previous_ids & ids:
+                async for item in self.stream_resource_items(method_name, limit=limit, offset=seen_count, **kwargs):
+                    yield item
+                return
+
+            for item in data:
+                yield item
+
+            seen_count += len(data)
+            previous_ids = ids
+
+            if 'next_cursor' in pagination:
+                if not data or not pagination['next_cursor']:
+                    break
+
+                cursor_args = { 'cursor': pagination['next_cursor'] }
+            else:
+                if len(data) < pagination.get('limit', limit):
+                    break
+
+                cursor_args = { 'after_id': data[-1]['id'] }
+
+    async def prefetch_all_resource_pages(self, method_name, handler, prefetch_pages, limit=HubApiClient.DEFAULT_PAGE_LIMIT, **kwargs):
+        method = getattr(self, method_name)
+
+        def fetch(offset):
+            return offset, asyncio.ensure_future(method(limit=limit, offset=offset, **kwargs))
+
+        pages = deque([fetch(0)])
+        next_offset = limit
+
+        try:
+            while pages:
+                offset, task = pages.popleft()
+                res = await task
+
+                pagination = res['meta']['pagination']
+                count = pagination['count']
+                total = pagination.get('total')
+
+                if count < limit:
+                    for _, pending in pages:
+                        pending.cancel()
+                    pages.clear()
+
+                    if count == 0 or (total is not None and offset + count >= total):
+                        total = offset + count
+                    else:
+                        limit = count
+
+                    next_offset = offset + count
+
+                while len(pages) < prefetch_pages and (total is None or next_offset < total):
+                    pages.append(fetch(next_offset))
+                    next_offset += limit
+
+                for item in res['data']:
+                    await self.handle_item(handler, item)
+        finally:
+            for _, pending in pages:
+                pending.cancel()
+
+    async def batch_call(self, method_name, kwargs):
+        try:
+            return self.BatchResult(result=await getattr(self, method_name)(**kwargs))
+        except Exception as e:
+            return self.BatchResult(error=e)
+
+    async def batch(self, calls, max_workers=None):
+        semaphore = asyncio.Semaphore(max_workers or self.pool_maxsize)
+
+        async def call(method_name, kwargs):
+            async with semaphore:
+                return await self.batch_call(method_name, kwargs)
+
+        return list(await asyncio.gather(*[call(method_name, kwargs) for method_name, kwargs in calls]))
+
+    async def map(self, method_name, kwargs_list, max_workers=None):
+        return await self.batch([(method_name, kwargs) for kwargs in kwargs_list], max_workers=max_workers)
+
+    async def upload_chunks(self, method_name, chunks, rows_param, max_in_flight=None, chunk_retries=2, on_chunk=None, **kwargs):
+        max_in_flight = max_in_flight or self.pool_maxsize
+        method = getattr(self, method_name) if isinstance(method_name, str) else method_name
+
+        async def upload(chunk):
+            params = dict(kwargs, **{ rows_param: chunk })
+            retry_counter = self.RetryCounter(self)
+            attempt = 0
+
+            while True:
+                try:
+                    return self.BatchResult(result=await method(**params))
+                except (self.RetryableApiError, self.NetworkError) as e:
+                    wait, error = self.chunk_retry_wait(retry_counter, e, attempt, chunk_retries)
+                    if wait is None:
+                        return self.BatchResult(error=error)
+
+                    await asyncio.sleep(wait)
+                    attempt += 1
+                except Exception as e:
+                    return self.BatchResult(error=e)
+
+        results = {}
+        pending = {}
+        chunks = enumerate(chunks)
+
+        while True:
+            for index, chunk in chunks:
+                pending[asyncio.ensure_future(upload(chunk))] = (index, len(chunk))
+                if len(pending) >= max_in_flight:
+                    break
+
+            if not pending:
+                break
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for future in done:
+                index, rows_count = pending.pop(future)
+                results[index] = future.result()
+
+                if on_chunk:
+                    on_chunk(index, rows_count, results[index])
+
+        return [results[index] for index in range(len(results))]
+
+    async def ingest_actuals(self, source, pipeline_id=None, endpoint_id=None, format=None, batch_rows=10000, batch_bytes=None,
+                             compress=False, max_in_flight=None, chunk_retries=2, on_batch=None, **kwargs):
+        create, on_chunk, report = self.prepare_ingest_actuals(pipeline_id, endpoint_id, compress, on_batch, kwargs)
+        await self.upload_chunks(
+            create, self.chunk_rows(self.read_rows(source, format), batch_rows, batch_bytes), 'actuals',
+            max_in_flight, chunk_retries, on_chunk, **kwargs
+        )
+
+        return report
+
+    async def get_statuses(self, objects, errors=None):
+        statuses = {}
+
+        for object, ids in self.group_status_objects(objects):
+            if self.multi_status_support.get(object, True):
+                object_statuses = await self.get_multi_statuses(object, ids)
+                if object_statuses is not None:
+                    statuses.update(object_statuses)
+                    continue
+
+            results = await self.map('get_status', [{ 'object': object, 'id': id } for id in ids])
+            statuses.update(self.parse_single_statuses(object, ids, results, errors))
+
+        return statuses
+
+    async def get_status_changes(self, objects, errors=None):
+        return self.record_status_changes(await self.get_statuses(objects, errors))
+
+    async def get_multi_statuses(self, object, ids):
+        path = '{api_prefix}/status'.format(api_prefix=self.API_PREFIX)
+        statuses = {}
+
+        for offset in range(0, len(ids), self.status_batch_size):
+            chunk = ids[offset:offset + self.status_batch_size]
+
+            try:
+                res = await self.make_and_handle_request('get', path, payload={ 'object': object, 'ids': chunk })
+            except (self.InvalidParamsError, self.FatalApiError) as e:
+                if not self.is_multi_status_unsupported(e):
+                    raise
+                res = None
+
+            chunk_statuses = self.parse_multi_statuses(object, chunk, res)
+            if chunk_statuses is None:
+                self.multi_status_support[object] = False
+                return None
+
+            statuses.update(chunk_statuses)
+
+        self.multi_status_support[object] = True
+        return statuses
+
+    # Event loop multiplexes waits, polls are limited by connections pool of the session
+    async def wait_for(self, resource, id, until=None, deadline=None, backoff=None):
+        if isinstance(id, (list, tuple)):
+            return list(await asyncio.gather(*[self.wait_for(resource, one_id, until, deadline, backoff) for one_id in id]))
+
+        poll = self.wait_poll(resource, id)
+        done = self.wait_condition(until)
+        backoff = backoff or self.poll_backoff
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + deadline if deadline is not None else None
+        attempt = 0
+
+        while True:
+            res = await poll()
+            if done(res):
+                return res
+
+            wait = backoff.wait(attempt)
+            attempt += 1
+
+            if deadline_at is not None:
+                if loop.time() >= deadline_at:
+                    raise self.wait_timeout_error(resource, id, deadline, res)
+
+                wait = min(wait, deadline_at - loop.time())
+
+            await asyncio.sleep(wait)
+
+    def wait_for_future(self, resource, id, until=None, deadline=None, backoff=None):
+        return asyncio.ensure_future(self.wait_for(resource, id, until, deadline, backoff))
+
+    # Actions are built by HubApiClient from API_SCHEMA, they return result of
+    # make_and_handle_request (a coroutine here), wrap them to be coroutine functions
+    def register_action(self, proc_name, proc):
+        # Streams return async generators as is
+        if proc_name.startswith('stream_'):
+            return super().register_action(proc_name, proc)
+
+        async def action(self, *args, **kwargs):
+            return await proc(self, *args, **kwargs)
+
+        action.__name__ = proc_name
+        super().register_action(proc_name, action)
@@ -0,0 +1,164 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+
+# Key of GET request, payload is normalized so the order of params doesn't matter
+# credentials - hash of auth token, responses cached for one token are not served for another
+def cache_key(resource_name, base_url, path, payload, credentials=None):
+    return (resource_name, base_url, path, json.dumps(payload, sort_keys=True, default=str), credentials)
+
+# In-memory response cache with per entry TTL and LRU eviction
+# Entries are grouped by resource name, so all of them can be invalidated at once
+class ResponseCache:
+    def __init__(self, max_size=1024, clock=time.monotonic):
+        self.max_size = max_size
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, resource_name, base_url, path, payload, credentials=None):
+        return cache_key(resource_name, base_url, path, payload, credentials)
+
+    # Returns copy of cached response or None
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self.entries[key]
+
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+
+        return copy.deepcopy(value)
+
+    def set(self, key, value, ttl):
+        value = copy.deepcopy(value)
+
+        with self.lock:
+            self.entries[key] = (self.clock() + ttl, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, resource_name):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == resource_name]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return { 'hits': self.hits, 'misses': self.misses, 'size': len(self.entries) }
+
+
+# Persistent response cache in SQLite database file, can be shared by processes on one node
+# Evicts least recently used entries when total size of stored responses is over max_bytes
+class SQLiteResponseCache:
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, timeout=30, clock=time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.clock = clock
+        # sqlite3 connection can't be shared between threads, nor used in a process forked after it's opened
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+        self.connection().execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, resource TEXT, value TEXT, size INTEGER, expires_at REAL, accessed_at REAL)'
+        )
+        self.connection().execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+
+    # Connection of the current thread, forked process opens its own one instead of inherited connection
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+
+        return connection
+
+    def key(self, resource_name, base_url, path, payload, credentials=None):
+        return cache_key(resource_name, base_url, path, payload, credentials)
+
+    def get(self, key):
+        connection = self.connection()
+        stored_key = json.dumps(key)
+        row = connection.execute('SELECT value, expires_at FROM responses WHERE key = ?', (stored_key,)).fetchone()
+
+        if row is None or (row[1] is not None and row[1] <= self.clock()):
+            self.misses += 1
+            return None
+
+        connection.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (self.clock(), stored_key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    # ttl - None to keep response until it is evicted
+    def set(self, key, value, ttl=None):
+        value = json.dumps(value)
+        now = self.clock()
+        expires_at = now + ttl if ttl is not None else None
+
+        self.connection().execute(
+            'INSERT OR REPLACE INTO responses (key, resource, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (json.dumps(key), key[0], value, len(value), expires_at, now)
+        )
+        self.evict()
+
+    def evict(self):
+        connection = self.connection()
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+        if total <= self.max_bytes:
+            return
+
+        evicted_keys = []
+        for key, size in connection.execute('SELECT key, size FROM responses ORDER BY accessed_at'):
+            if total <= self.max_bytes:
+                break
+
+            evicted_keys.append((key,))
+            total -= size
+
+        connection.executemany('DELETE FROM responses WHERE key = ?', evicted_keys)
+
+    def invalidate(self, resource_name):
+        self.connection().execute('DELETE FROM responses WHERE resource = ?', (resource_name,))
+
+    def clear(self):
+        self.connection().execute('DELETE FROM responses')
+
+    def stats(self):
+        size, total = self.connection().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return { 'hits': self.hits, 'misses': self.misses, 'size': size, 'bytes': total }
+
+    # Closes connection of the current thread, connection inherited from parent process is left to the parent
+    def close(self):
+        connection = getattr(self.local, 'connection', None)
+
+        if connection is not None:
+            if self.local.pid == os.getpid():
+                connection.close()
+            self.local.connection = None
@@ -0,0 +1,95 @@
+import threading
+import time
+
+# Stops requests to a failing service for a while, instead of waiting through retries of each request
+# closed - requests are allowed, `failure_threshold` consecutive failures open the circuit
+# open - requests fail fast, after `recovery_timeout` seconds the circuit becomes half-open
+# half-open - at most `half_open_max_calls` trial requests are allowed at once,
+# `success_threshold` successes close the circuit, any failure opens it again
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30, half_open_max_calls=1, success_threshold=1,
+                 on_state_change=None, name=None, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.success_threshold = success_threshold
+        # on_state_change(name, old_state, new_state)
+        self.on_state_change = on_state_change
+        self.name = name
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.successes = 0
+        self.half_open_calls = 0
+        self.opened_at = None
+
+    # Returns False if request should fail fast
+    def allow(self):
+        with self.lock:
+            changes = []
+
+            if self.state == self.OPEN and self.clock() >= self.opened_at + self.recovery_timeout:
+                changes.append(self.change_state(self.HALF_OPEN))
+
+            if self.state == self.OPEN:
+                allowed = False
+            elif self.state == self.HALF_OPEN:
+                allowed = self.half_open_calls < self.half_open_max_calls
+                if allowed:
+                    self.half_open_calls += 1
+            else:
+                allowed = True
+
+        self.notify(changes)
+        return allowed
+
+    def record_success(self):
+        with self.lock:
+            changes = []
+
+            if self.state == self.HALF_OPEN:
+                self.half_open_calls = max(0, self.half_open_calls - 1)
+                self.successes += 1
+                if self.successes >= self.success_threshold:
+                    changes.append(self.change_state(self.CLOSED))
+            else:
+                self.failures = 0
+
+        self.notify(changes)
+
+    # Gives back half-open trial slot of a request which ended without outcome, e.g. cancelled one
+    def release(self):
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.half_open_calls = max(0, self.half_open_calls - 1)
+
+    def record_failure(self):
+        with self.lock:
+            changes = []
+            self.failures += 1
+
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                changes.append(self.change_state(self.OPEN))
+
+        self.notify(changes)
+
+    # Must be called under the lock, returns (old_state, new_state)
+    def change_state(self, state):
+        old_state, self.state = self.state, state
+        self.failures = 0
+        self.successes = 0
+        self.half_open_calls = 0
+        self.opened_at = self.clock() if state == self.OPEN else None
+
+        return old_state, state
+
+    # Callback is called outside of the lock, so it can use the breaker
+    def notify(self, changes):
+        if self.on_state_change:
+            for old_state, new_state in changes:
+                self.on_state_change(self.name, old_state, new_state)
@@ -0,0 +1,108 @@
+import datetime
+import decimal
+import json
+import math
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Converts values which JSON doesn't support natively: numpy scalars and arrays, dates, decimals
+def json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    # numpy arrays and scalars, without importing numpy
+    if hasattr(value, 'tolist') and hasattr(value, 'dtype'):
+        return value.tolist()
+
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+
+# Encodes value to JSON in chunks: dicts item by item and long lists by `batch_size` items,
+# so large payloads are not kept as one big string. dumps(value) -> bytes encodes leaf values
+def iter_json(value, dumps, batch_size=1000):
+    if isinstance(value, dict):
+        yield b'{'
+
+        for index, (key, item) in enumerate(value.items()):
+            yield (b',' if index else b'') + dumps(key if isinstance(key, str) else str(key)) + b':'
+            yield from iter_json(item, dumps, batch_size)
+
+        yield b'}'
+    elif isinstance(value, list) and len(value) > batch_size:
+        yield b'['
+
+        for offset in range(0, len(value), batch_size):
+            yield (b',' if offset else b'') + dumps(value[offset:offset + batch_size])[1:-1]
+
+        yield b']'
+    else:
+        yield dumps(value)
+
+
+# Replaces NaN and Infinity (not valid JSON, API rejects them) with None, as orjson encodes them
+def finite_json(value):
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, decimal.Decimal):
+        return finite_json(float(value))
+    if isinstance(value, dict):
+        return { key: finite_json(item) for key, item in value.items() }
+    if isinstance(value, (list, tuple)):
+        return [finite_json(item) for item in value]
+    if hasattr(value, 'tolist') and hasattr(value, 'dtype'):
+        return finite_json(value.tolist())
+
+    return value
+
+
+# Encodes request bodies to bytes and decodes response bodies with stdlib json
+# NaN and Infinity are encoded as null, payload is copied for that only if it has them
+class JsonCodec:
+    name = 'json'
+
+    def dumps(self, value):
+        try:
+            return json.dumps(value, default=json_default, allow_nan=False).encode('utf-8')
+        except ValueError:
+            return json.dumps(finite_json(value), default=json_default, allow_nan=False).encode('utf-8')
+
+    def iter_dumps(self, value):
+        return iter_json(value, self.dumps)
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+# Same with orjson, several times faster on large payloads
+# numpy arrays are serialized natively, NaN and Infinity are encoded as null
+class OrjsonCodec:
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('OrjsonCodec requires orjson, install it with `pip install auger-hub-api-client[orjson]`')
+
+    def dumps(self, value):
+        return orjson.dumps(value, default=json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+    def iter_dumps(self, value):
+        return iter_json(value, self.dumps)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+# codec - 'auto' (orjson if it is installed), 'json', 'orjson' or codec instance
+def build_codec(codec='auto'):
+    if codec == 'auto':
+        return OrjsonCodec() if orjson is not None else JsonCodec()
+    elif codec == 'json':
+        return JsonCodec()
+    elif codec == 'orjson':
+        return OrjsonCodec()
+    else:
+        return codec
@@ -1,22 +1,48 @@
-import gzip
+import csv
+import hashlib
+import itertools
 import json
 import re
 import requests
+import threading
 import time
+import zlib
 
 # Python 3
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.cookiejar import DefaultCookiePolicy
 from io import StringIO
 from urllib.parse import urljoin
 from json.decoder import JSONDecodeError
 from bs4 import BeautifulSoup
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError
 
+from .cache import ResponseCache, SQLiteResponseCache, cache_key
+from .circuit_breaker import CircuitBreaker
+from .codec import build_codec, json_default
+from .polling import ExponentialBackoff, Poller
+from .query import url_with_query
+from .rate_limiter import AdaptiveConcurrency, RateLimiter
+from .retry import RetryBudget, RetryPolicy, parse_retry_after
+from .single_flight import SingleFlight
+from .tabular import is_tabular, iter_tabular_records, tabular_records
+
 class HubApiClient:
+    # status_code - HTTP status of the response, if error was raised for a response
     class BaseError(Exception):
-        def __init__(self, *args):
+        def __init__(self, *args, status_code=None):
             super().__init__(*args)
             self.request_details = None
+            self.status_code = status_code
 
         def metadata(self):
             return self.args[1]
@@ -31,7 +57,7 @@ class HubApiClient:
             return ' '.join(message)
 
         def add_request_details(self, method, path, payload):
-            self.request_details = ' '.join(['on:', method.upper(), path, json.dumps(payload)])
+            self.request_details = ' '.join(['on:', method.upper(), path, json.dumps(payload, default=json_default)])
 
     # Means that consumer code can't do nothing with this error
     # Only changing of comnsumer source code or config parameters can help
@@ -47,29 +73,58 @@ class HubApiClient:
         pass
 
     # Temporary app server issue, retry can help
+    # retry_after - seconds from Retry-After header of response, if any
     class RetryableApiError(BaseError):
+        def __init__(self, *args, retry_after=None, status_code=None):
+            super().__init__(*args, status_code=status_code)
+            self.retry_after = retry_after
+
+    # Retry is not allowed by retry budget of the client, temporary until enough requests succeed
+    class RetryBudgetExhaustedError(RetryableApiError):
+        pass
+
+    # Circuit breaker of the service is open after its failures, request is not made
+    class CircuitOpenError(NetworkError):
         pass
 
     class MissingParamError(BaseError):
         pass
 
+    # Polled object didn't reach expected status before deadline, second arg is the last response
+    class WaitTimeoutError(BaseError):
+        pass
+
     class DSLError(Exception):
         pass
 
+    # Counts retries of one request, waits between them are decided by retry policies of the client,
+    # separate ones for NetworkError and RetryableApiError
     class RetryCounter:
         def __init__(self, hub_api_client=None):
             if hub_api_client:
-                self.retries_left = hub_api_client.retries_count
-                self.connection_retries_left = hub_api_client.connection_retries_count
+                self.retry_policy = hub_api_client.retry_policy
+                self.network_retry_policy = hub_api_client.network_retry_policy
+                self.retry_budget = hub_api_client.retry_budget
+                self.retries_left = self.retry_policy.max_retries
+                self.connection_retries_left = self.network_retry_policy.max_retries
             else:
+                self.retry_policy = None
+                self.network_retry_policy = None
+                self.retry_budget = None
                 self.retries_left = 0
                 self.connection_retries_left = 0
 
+            self.retries = 0
+            self.connection_retries = 0
+            self.started_at = time.monotonic()
+
         def count_retry(self, error):
             if isinstance(error, HubApiClient.RetryableApiError):
                 self.retries_left -= 1
+                self.retries += 1
             elif isinstance(error, HubApiClient.NetworkError):
                 self.connection_retries_left -= 1
+                self.connection_retries += 1
             else:
                 raise RuntimeError('Unsupported kind of error {error}'.format(error=error))
 
@@ -78,22 +133,141 @@ class HubApiClient:
         def is_retries_available(self):
             return self.retries_left > 0 and self.connection_retries_left > 0
 
+        # Returns seconds to wait before retry of request failed with error, or None if it shouldn't be retried
+        def retry_wait(self, error):
+            if isinstance(error, HubApiClient.NetworkError):
+                policy, attempt, retries_left = self.network_retry_policy, self.connection_retries, self.connection_retries_left
+            else:
+                policy, attempt, retries_left = self.retry_policy, self.retries, self.retries_left
+
+            if policy is None or retries_left <= 0:
+                return None
+
+            wait = policy.wait(attempt, time.monotonic() - self.started_at, getattr(error, 'retry_after', None))
+
+            if wait is not None and self.retry_budget is not None and not self.retry_budget.withdraw():
+                raise HubApiClient.RetryBudgetExhaustedError(
+                    'Retry budget is exhausted, failed with: {error}'.format(error=error.args[0]), *error.args[1:],
+                    status_code=error.status_code
+                )
+
+            return wait
+
         @classmethod
         def none(cls):
             return cls()
 
+    # Result of a single call in a batch, API errors are captured instead of raised
+    class BatchResult:
+        def __init__(self, result=None, error=None):
+            self.result = result
+            self.error = error
+
+        def __repr__(self):
+            return 'BatchResult(result={!r}, error={!r})'.format(self.result, self.error)
+
+        @property
+        def ok(self):
+            return self.error is None
+
+        # Returns result or raises captured error
+        def unwrap(self):
+            if self.error is not None:
+                raise self.error
+
+            return self.result
+
+    # Progress and result of bulk ingestion, failed_batches is a list of (index, rows_count, error)
+    class IngestReport:
+        def __init__(self):
+            self.rows = 0
+            self.batches = 0
+            self.failed_batches = []
+            self.started_at = time.monotonic()
+            self.seconds = 0
+
+        def __repr__(self):
+            return 'IngestReport(rows={}, batches={}, failed_batches={}, rows_per_second={:.1f})'.format(
+                self.rows, self.batches, len(self.failed_batches), self.rows_per_second
+            )
+
+        @property
+        def ok(self):
+            return not self.failed_batches
+
+        @property
+        def failed_rows(self):
+            return sum(rows_count for _, rows_count, _ in self.failed_batches)
+
+        # Rate of successfully uploaded rows
+        @property
+        def rows_per_second(self):
+            return (self.rows - self.failed_rows) / self.seconds if self.seconds else 0.0
+
+        def record(self, index, rows_count, result):
+            self.rows += rows_count
+            self.batches += 1
+            self.seconds = time.monotonic() - self.started_at
+
+            if not result.ok:
+                self.failed_batches.append((index, rows_count, result.error))
+
+    # Adjusts page size by response time and payload size of fetched pages
+    # Grows limit while next page is expected to stay under targets and below the last limit failed with error,
+    # shrinks it when response is over targets or RetryableApiError happens
+    class AdaptivePageSize:
+        def __init__(self, limit=50, min_limit=10, max_limit=1000, target_seconds=1.0, target_bytes=1024 * 1024,
+                     grow_factor=2.0, shrink_factor=0.5, on_change=None):
+            self.limit = limit
+            self.min_limit = min_limit
+            self.max_limit = max_limit
+            self.target_seconds = target_seconds
+            self.target_bytes = target_bytes
+            self.grow_factor = grow_factor
+            self.shrink_factor = shrink_factor
+            self.on_change = on_change
+            # Last (limit, seconds, bytes) samples
+            self.history = deque(maxlen=100)
+            # Last limit failed with RetryableApiError, limit doesn't grow up to it again
+            self.failed_limit = None
+
+        def record(self, seconds, size):
+            self.history.append((self.limit, seconds, size))
+
+            if seconds > self.target_seconds or size > self.target_bytes:
+                self.change_limit(self.limit * self.shrink_factor)
+            elif seconds * self.grow_factor <= self.target_seconds and size * self.grow_factor <= self.target_bytes:
+                if self.failed_limit is None or self.limit * self.grow_factor < self.failed_limit:
+                    self.change_limit(self.limit * self.grow_factor)
+
+        # Returns True if limit was decreased and request makes sense to retry with smaller page
+        def record_error(self, error):
+            limit = self.failed_limit = self.limit
+            self.change_limit(self.limit * self.shrink_factor)
+            return self.limit < limit
+
+        def change_limit(self, limit):
+            limit = max(self.min_limit, min(self.max_limit, int(limit)))
+
+            if limit != self.limit:
+                old_limit, self.limit = self.limit, limit
+                if self.on_change:
+                    self.on_change(old_limit, limit)
+
     API_SCHEMA = {
         'actual': {
             'actions': ['create']
         },
         'cluster_task': {
-            'actions': ['index', 'show', 'create', 'update']
+            'actions': ['index', 'show', 'create', 'update'],
+            'revalidate': True,
         },
         'cluster_status': {
             'actions': ['index']
         },
         'dataset_manifest': {
-            'actions': ['index', 'show', 'create', 'update']
+            'actions': ['index', 'show', 'create', 'update'],
+            'cache_ttl': 60,
         },
         'endpoint': {
             'actions': ['index', 'show', 'create', 'update', 'delete']
@@ -110,6 +284,7 @@ class HubApiClient:
             'actions': ['index', 'show', 'create'],
             'resource_name': 'prediction',
             'parent_resource': 'endpoint',
+            'tabular': True,
         },
         'endpoint_roi_validation': {
             'actions': ['create'],
@@ -117,16 +292,21 @@ class HubApiClient:
             'parent_resource': 'endpoint',
         },
         'experiment': {
-            'actions': ['index', 'show', 'create', 'update', 'delete']
+            'actions': ['index', 'show', 'create', 'update', 'delete'],
+            'cache_ttl': 60,
         },
         'experiment_session': {
             'actions': ['index', 'show', 'create', 'update'],
+            'revalidate': True,
         },
         'hyperparameter': {
-            'actions': ['index', 'show', 'create']
+            'actions': ['index', 'show', 'create'],
+            'immutable': ['show'],
         },
         'instance_type': {
-            'actions': ['index']
+            'actions': ['index'],
+            'cache_ttl': 3600,
+            'immutable': ['index'],
         },
         'organization': {
             'actions': ['index', 'show', 'create', 'update', 'delete']
@@ -135,11 +315,15 @@ class HubApiClient:
             'actions': ['index', 'show', 'create', 'update']
         },
         'pipeline_file': {
-            'actions': ['index', 'show', 'create']
+            'actions': ['index', 'show', 'create'],
+            'immutable': ['show'],
         },
         # Legacy endpoint
         'prediction': {
-            'actions': ['index', 'show', 'create']
+            'actions': ['index', 'show', 'create'],
+            'cursor_pagination': True,
+            # `records` can be pandas DataFrame or NumPy array
+            'tabular': True,
         },
         # New endpoint
         'prediction_group': {
@@ -156,7 +340,8 @@ class HubApiClient:
                     'deploy': 'patch',
                     'undeploy': 'patch'
                 }
-            ]
+            ],
+            'cache_ttl': 60,
         },
         'project_file': {
             'actions': ['index', 'show', 'create', 'delete']
@@ -165,13 +350,15 @@ class HubApiClient:
             'actions': ['create', 'index']
         },
         'pod_log': {
-            'actions': ['index']
+            'actions': ['index'],
+            'cursor_pagination': True,
         },
         'review_alert': {
             'actions': ['index', 'show', 'create', 'update', 'delete']
         },
         'review_alert_item': {
-            'actions': ['index', 'show']
+            'actions': ['index', 'show'],
+            'cursor_pagination': True,
         },
         'similar_trials_request': {
             'actions': ['show', 'create']
@@ -180,17 +367,26 @@ class HubApiClient:
             'actions': ['create']
         },
         'trial': {
-            'actions': ['index', 'show', 'create', 'update']
+            'actions': ['index', 'show', 'create', 'update'],
+            'cursor_pagination': True,
+            # Only completed trials don't change
+            'immutable': ['show'],
+            'immutable_when': {'status': ['completed']},
         },
         'trial_search': {
             'actions': ['index', 'show', 'create', 'update']
         },
         'warm_start_request': {
-            'actions': ['show', 'create']
+            'actions': ['show', 'create'],
+            'revalidate': True,
         }
     }
 
     API_PREFIX = '/api/v1'
+    DEFAULT_PAGE_LIMIT = 50
+
+    # Supported values of `compression`, also sent as Content-Encoding
+    COMPRESSIONS = ('gzip', 'zstd')
 
     def __init__(self, **config):
         self.base_url = config['hub_app_url']
@@ -199,20 +395,173 @@ class HubApiClient:
         self.system_token = config.get('hub_system_token', None)
         self.cluster_api_token = config.get('hub_cluster_api_token', None)
         self.project_api_token = config.get('hub_project_api_token', None)
+        # 'body' to send params of GET requests in JSON body, 'query' to send them in canonical query string
+        self.get_params = config.get('get_params', 'body')
+        # 'payload' to send token in request params, 'header' to send it in Authorization header,
+        # tokens are never sent in URLs, so params in query string require header
+        self.auth_mode = config.get('auth_mode', 'header' if self.get_params == 'query' else 'payload')
+        if self.get_params == 'query' and self.auth_mode != 'header':
+            raise ValueError("get_params='query' requires auth_mode='header', tokens must not be sent in URLs")
         self.retries_count = config.get('retries_count', 5)
         self.connection_retries_count = config.get('connection_retries_count', self.retries_count)
         self.retry_wait_seconds = config.get('retry_wait_seconds', 5)
         self.debug = config.get('debug', False)
+        # Encoding of request bodies and decoding of responses, 'auto' uses orjson if it is installed
+        self.codec = build_codec(config.get('json_codec', 'auto'))
+        # Retry policies for RetryableApiError and NetworkError of GET requests,
+        # by default `retries_count` (`connection_retries_count`) retries with fixed `retry_wait_seconds` between them
+        self.retry_policy = config.get('retry_policy') or RetryPolicy.constant(self.retries_count, self.retry_wait_seconds)
+        self.network_retry_policy = config.get('network_retry_policy') or \
+            RetryPolicy.constant(self.connection_retries_count, self.retry_wait_seconds)
+        # Optional retry budget, True for a budget per client, 'process' for one shared by clients or RetryBudget instance
+        retry_budget = config.get('retry_budget', None)
+        if retry_budget is True:
+            retry_budget = RetryBudget()
+        elif retry_budget == 'process':
+            retry_budget = RetryBudget.shared()
+        self.retry_budget = retry_budget
+
+        # Optional circuit breaker per base url, True or dict of CircuitBreaker options
+        # on_circuit_state_change(base_url, old_state, new_state) is called on state changes
+        circuit_breaker = config.get('circuit_breaker', False)
+        self.circuit_breaker_options = {} if circuit_breaker is True else (circuit_breaker or None)
+        self.on_circuit_state_change = config.get('on_circuit_state_change', None)
+        self.circuit_breakers = {}
+        self.circuit_breakers_lock = threading.Lock()
+
+        # Optional client-side throttling: `rate_limit` requests per second for all requests,
+        # `rate_limits` per HTTP method or resource name, e.g. {'post': 10, 'actual': (5, 20)}
+        rate_limit = config.get('rate_limit', None)
+        rate_limits = config.get('rate_limits', None)
+        self.rate_limiter = RateLimiter(rate_limit, rate_limits) if rate_limit or rate_limits else None
+        # AIMD limit of concurrent requests, True, dict of AdaptiveConcurrency options or instance
+        adaptive_concurrency = config.get('adaptive_concurrency', None)
+        if adaptive_concurrency is True:
+            adaptive_concurrency = AdaptiveConcurrency()
+        elif isinstance(adaptive_concurrency, dict):
+            adaptive_concurrency = AdaptiveConcurrency(**adaptive_concurrency)
+        self.adaptive_concurrency = adaptive_concurrency
+
+        # Connection pooling, one keep-alive session per base url (Hub app and optimizers service)
+        self.pool_connections = config.get('pool_connections', 10)
+        self.pool_maxsize = config.get('pool_maxsize', 10)
+        self.keep_alive = config.get('keep_alive', True)
+        self.session_factory = config.get('session_factory', self.build_session)
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+        # Optional cache of GET responses for resources with `cache_ttl` in API_SCHEMA
+        # `cache` can be True or ResponseCache instance, `cache_ttls` overrides TTLs per resource
+        cache = config.get('cache', False)
+        self.cache = ResponseCache(max_size=config.get('cache_size', 1024)) if cache is True else (cache or None)
+        self.cache_ttls = config.get('cache_ttls', {})
+
+        # Persistent cache for GET responses of immutable resources (`immutable` in API_SCHEMA),
+        # SQLiteResponseCache instance or path to its database file
+        persistent_cache = config.get('persistent_cache', None)
+        self.persistent_cache = SQLiteResponseCache(persistent_cache) if isinstance(persistent_cache, str) else persistent_cache
+
+        # Conditional GET requests (If-None-Match/If-Modified-Since) for resources with `revalidate` in API_SCHEMA,
+        # validators and bodies of last responses are kept to be returned on 304 Not Modified
+        self.conditional_requests = config.get('conditional_requests', False)
+        self.validators = ResponseCache(max_size=config.get('validators_size', 256))
+
+        # Concurrent identical GET requests share one in-flight request
+        self.coalescing = self.build_coalescing() if config.get('coalesce_requests', False) else None
+
+        # Polling of server-side jobs with `wait_for`, one scheduler thread for all waits of the client
+        self.poll_backoff = config.get('poll_backoff', ExponentialBackoff())
+        self.poll_workers = config.get('poll_workers', self.pool_maxsize)
+        self.poller = None
+        self.poller_lock = threading.Lock()
+
+        # Batched status requests, object types without multi-id form of /status fall back to concurrent requests
+        self.status_batch_size = config.get('status_batch_size', 100)
+        self.multi_status_support = {}
+        # Last known statuses for `get_status_changes`
+        self.last_statuses = {}
+        self.statuses_lock = threading.Lock()
+
+        # Per thread details of the last response
+        self.local = threading.local()
+
+        # Compression of requests made with gzip=True (optimizers service): 'gzip' or 'zstd',
+        # payloads smaller than `compression_threshold` bytes are sent uncompressed,
+        # payloads of `compression_stream_threshold` bytes and more are sent as chunked body without Content-Length,
+        # streaming is off by default, since some servers (e.g. wsgiref) don't read chunked bodies
+        self.compression = config.get('compression', 'gzip')
+        self.compression_level = config.get('compression_level', 9 if self.compression == 'gzip' else 3)
+        self.compression_threshold = config.get('compression_threshold', 0)
+        self.compression_stream_threshold = config.get('compression_stream_threshold', None)
+        if self.compression not in self.COMPRESSIONS:
+            raise ValueError('Unsupported compression `{compression}`, use one of: {compressions}'.format(
+                compression=self.compression, compressions=', '.join(self.COMPRESSIONS)
+            ))
+        if self.compression == 'zstd' and zstandard is None:
+            raise ImportError('zstd compression requires zstandard, install it with `pip install auger-hub-api-client[zstd]`')
 
         self.headers = { 'Content-Type': 'application/json' }
         self.gzip_headers = self.headers.copy()
-        self.gzip_headers['Content-Encoding'] = 'gzip'
+        self.gzip_headers['Content-Encoding'] = self.compression
 
         self.define_actions()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def build_session(self, base_url):
+        session = requests.Session()
+
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        # API is stateless, don't carry cookies between requests like module level requests calls
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+
+        return session
+
+    def session(self, base_url):
+        with self.sessions_lock:
+            session = self.sessions.get(base_url)
+
+            if session is None:
+                session = self.session_factory(base_url)
+                self.sessions[base_url] = session
+
+            return session
+
+    def close(self):
+        with self.sessions_lock:
+            sessions = list(self.sessions.values())
+            self.sessions = {}
+
+        for session in sessions:
+            session.close()
+
+        with self.poller_lock:
+            poller, self.poller = self.poller, None
+
+        if poller is not None:
+            poller.close()
+
+    def build_coalescing(self):
+        return SingleFlight()
+
+    def coalescing_key(self, method_name, base_url, path, payload, plain_text, headers):
+        if self.coalescing is None or method_name != 'get':
+            return None
+
+        return cache_key(None, base_url, path, payload) + (plain_text, json.dumps(headers, sort_keys=True))
+
     def log_request(self, method, path, payload):
         if self.debug:
-            print('HAC.Req: ' + method.upper() + ' ' + path + ' params: ' + json.dumps(payload))
+            print('HAC.Req: ' + method.upper() + ' ' + path + ' params: ' + self.codec.dumps(payload).decode('utf-8'))
 
     def log_response(self, method, path, response):
         if self.debug:
@@ -264,35 +613,124 @@ class HubApiClient:
         else:
             return {}
 
-    def request(self, method_name, path, base_url, payload={}, gzip=False):
+    # Part of cache keys, so cached responses are shared only by clients with the same token
+    def credentials_hash(self):
+        tokens = self.tokens_payload()
+        if not tokens:
+            return None
+
+        return hashlib.sha256(json.dumps(tokens, sort_keys=True).encode('utf-8')).hexdigest()
+
+    # Authorization header with the token of tokens_payload, e.g. `Token token="...", type="project_api_token"`
+    def auth_headers(self):
+        tokens = self.tokens_payload()
+        if not tokens:
+            return {}
+
+        token_type, token = next(iter(tokens.items()))
+        return { 'Authorization': 'Token token="{token}", type="{type}"'.format(token=token, type=token_type) }
+
+    # Returns request params and headers with token: in payload (copy of it) or in Authorization header
+    def authorize(self, payload, headers):
+        if self.auth_mode == 'header':
+            return payload, self.merge_headers(self.auth_headers(), headers)
+
+        params = payload.copy()
+        params.update(self.tokens_payload())
+        return params, headers
+
+    def request(self, method_name, path, base_url, payload={}, gzip=False, headers=None):
         try:
-            method = getattr(requests, method_name)
+            method = getattr(self.session(base_url), method_name)
 
-            params = payload.copy()
-            params.update(self.tokens_payload())
+            params, headers = self.authorize(payload, headers)
 
             full_path = self.full_path(relative_path=path, base_url=base_url)
 
             if gzip:
-                data = self.compress(json.dumps(params))
-                return method(full_path, data=data, headers=self.gzip_headers)
+                data, body_headers = self.compressed_body(params)
+                return method(full_path, data=data, headers=self.merge_headers(body_headers, headers))
+            elif self.params_in_query(method_name):
+                return method(url_with_query(full_path, params), headers=self.merge_headers(self.headers, headers))
             else:
-                return method(full_path, json=params, headers=self.headers)
+                return method(full_path, data=self.codec.dumps(params), headers=self.merge_headers(self.headers, headers))
         except ConnectionError as e:
             raise self.NetworkError(str(e))
 
+    def params_in_query(self, method_name):
+        return self.get_params == 'query' and method_name.lower() == 'get'
+
+    def merge_headers(self, headers, extra_headers):
+        if extra_headers:
+            headers = headers.copy()
+            headers.update(extra_headers)
+
+        return headers
+
     def compress(self, data):
-        if hasattr(gzip, 'compress'):
-            # Python 3
-            return gzip.compress(bytes(data, 'utf-8'))
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        return b''.join(self.compress_chunks([data]))
+
+    # Returns (body, headers), body is compressed bytes with Content-Length,
+    # a generator of compressed chunks, encoded and compressed on the fly, when payload is larger than compression_stream_threshold
+    # or plain bytes when payload is smaller than compression_threshold
+    def compressed_body(self, params):
+        chunks = iter(self.codec.iter_dumps(params) if hasattr(self.codec, 'iter_dumps') else [self.codec.dumps(params)])
+        head = []
+
+        size, exhausted = self.read_chunks(chunks, head, 0, self.compression_threshold)
+        if exhausted:
+            return b''.join(head), self.headers
+
+        if self.compression_stream_threshold is not None:
+            size, exhausted = self.read_chunks(chunks, head, size, self.compression_stream_threshold)
+            if not exhausted:
+                return self.compress_chunks(itertools.chain(head, chunks)), self.gzip_headers
+
+        data = b''.join(self.compress_chunks(itertools.chain(head, chunks)))
+        return data, self.merge_headers(self.gzip_headers, {'Content-Length': str(len(data))})
+
+    # Appends chunks to head until their size reaches limit, returns (size, exhausted)
+    def read_chunks(self, chunks, head, size, limit):
+        for chunk in chunks:
+            head.append(chunk)
+            size += len(chunk)
+
+            if size >= limit:
+                return size, False
+
+        return size, True
+
+    def compress_chunks(self, chunks):
+        if self.compression == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=self.compression_level).compressobj()
+        else:
+            # wbits=31 writes gzip header and trailer
+            compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, 31)
+
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+
+        yield compressor.flush()
+
+    # Returned by handle_response on 304 status, when request was made with validators
+    NOT_MODIFIED = object()
+
+    # conditional - request was sent with validators, otherwise 304 is unexpected like any other status
+    def handle_response(self, res, plain_text=False, conditional=False):
+        if res.status_code == 304 and conditional:
+            return self.NOT_MODIFIED
 
-    def handle_response(self, res, plain_text=False):
         if plain_text:
             reponse = res.text
             meta = None
         else:
             try:
-                reponse = res.json()
+                reponse = self.codec.loads(res.content)
                 meta = reponse.get('meta')
             except (JSONDecodeError, ValueError):
                 response = res.text
@@ -302,13 +740,16 @@ class HubApiClient:
             return reponse
         elif res.status_code == 400:
             # Invalid input data, we can't do anyting, consumer should fix source code
-            raise self.InvalidParamsError(self.format_response(res), meta)
-        elif res.status_code == 401 or res.status_code == 403 or res.status_code == 404 or res.status_code == 500:
+            raise self.InvalidParamsError(self.format_response(res), meta, status_code=res.status_code)
+        elif res.status_code in (401, 403, 404, 405, 500):
             # Invalid token or error in source code, we can't do anyting raise error
-            raise self.FatalApiError(self.format_response(res), meta)
+            raise self.FatalApiError(self.format_response(res), meta, status_code=res.status_code)
         else:
             # In case of another error we can retry
-            raise self.RetryableApiError(self.format_response(res), meta)
+            raise self.RetryableApiError(
+                self.format_response(res), meta,
+                retry_after=parse_retry_after(res.headers.get('Retry-After')), status_code=res.status_code
+            )
 
     def format_api_error(self, error):
         return '{param} {message}'.format(
@@ -319,34 +760,183 @@ class HubApiClient:
     def format_response(self, res):
         try:
             if res.status_code == 400:
-                errors = res.json()['meta']['errors']
+                errors = self.codec.loads(res.content)['meta']['errors']
                 return ', '.join(map(lambda error: self.format_api_error(error), errors))
             else:
                 return 'status: {}, body: {}'.format(res.status_code, self.extract_plain_text(res))
         except (JSONDecodeError, ValueError) as e:
-            raise self.FatalApiError(self.extract_plain_text(res))
+            raise self.FatalApiError(self.extract_plain_text(res), status_code=res.status_code)
+
+    def default_retry_counter(self, method_name):
+        # Allow retries for get request, because it deosn't modify any data on server
+        if method_name == 'get':
+            return self.RetryCounter(self)
+        # But don't allow to retry another (POST, PUT, DELETE, etc) requests
+        else:
+            return self.RetryCounter.none()
+
+    def response_cache_ttl(self, method_name, resource_name):
+        if self.cache is None or method_name != 'get' or resource_name is None:
+            return None
+
+        if resource_name in self.cache_ttls:
+            return self.cache_ttls[resource_name]
+        else:
+            return self.API_SCHEMA.get(resource_name, {}).get('cache_ttl')
+
+    def is_revalidated(self, method_name, resource_name):
+        return (
+            self.conditional_requests and method_name == 'get' and resource_name is not None and
+            self.API_SCHEMA.get(resource_name, {}).get('revalidate', False)
+        )
+
+    def is_persistent(self, method_name, resource_name, action_name):
+        return (
+            self.persistent_cache is not None and method_name == 'get' and resource_name is not None and
+            action_name in self.API_SCHEMA.get(resource_name, {}).get('immutable', [])
+        )
+
+    def is_immutable_response(self, resource_name, res):
+        conditions = self.API_SCHEMA[resource_name].get('immutable_when', {})
+        data = res.get('data') if isinstance(res, dict) else None
+
+        for field, values in conditions.items():
+            if not isinstance(data, dict) or data.get(field) not in values:
+                return False
+
+        return True
+
+    # Looks up cached response and validators before request, returns dict with
+    # `response` if request isn't needed, or with `headers` to send otherwise
+    def prepare_request_state(self, method_name, base_url, path, payload, resource_name, action_name=None):
+        state = { 'headers': None, 'cache_ttl': self.response_cache_ttl(method_name, resource_name) }
+
+        if self.is_persistent(method_name, resource_name, action_name):
+            state['persistent_key'] = self.persistent_cache.key(resource_name, base_url, path, payload, self.credentials_hash())
+            res = self.persistent_cache.get(state['persistent_key'])
+            if res is not None:
+                state['response'] = res
+                return state
+
+        if state['cache_ttl']:
+            state['cache_key'] = self.cache.key(resource_name, base_url, path, payload, self.credentials_hash())
+            res = self.cache.get(state['cache_key'])
+            if res is not None:
+                state['response'] = res
+                return state
+
+        if self.is_revalidated(method_name, resource_name):
+            state['validators_key'] = self.validators.key(resource_name, base_url, path, payload)
+            validated = self.validators.get(state['validators_key'])
+
+            if validated:
+                state['validated'] = validated['response']
+                state['headers'] = {}
+                if validated['etag']:
+                    state['headers']['If-None-Match'] = validated['etag']
+                if validated['last_modified']:
+                    state['headers']['If-Modified-Since'] = validated['last_modified']
+
+        return state
+
+    def is_conditional(self, headers):
+        return bool(headers) and ('If-None-Match' in headers or 'If-Modified-Since' in headers)
+
+    # 304 response is replaced with the stored body before it can be shared with coalesced callers,
+    # validators of it are already stored
+    def resolve_not_modified(self, state, res):
+        if res is self.NOT_MODIFIED:
+            state.pop('validators_key', None)
+            return state['validated']
+
+        return res
+
+    # Stores response and validators (from response `headers`) after request, returns response for consumer
+    def complete_request_state(self, state, method_name, resource_name, res, headers=None):
+        if 'validators_key' in state:
+            headers = headers or {}
+            etag = headers.get('ETag')
+            last_modified = headers.get('Last-Modified')
+
+            if etag or last_modified:
+                self.validators.set(
+                    state['validators_key'],
+                    { 'etag': etag, 'last_modified': last_modified, 'response': res },
+                    float('inf')
+                )
 
-    def make_and_handle_request(self, method_name, path, base_url=None, payload={}, retry_counter=None, plain_text=False, gzip=False):
+        if 'persistent_key' in state and self.is_immutable_response(resource_name, res):
+            self.persistent_cache.set(state['persistent_key'], res)
+
+        if state['cache_ttl']:
+            self.cache.set(state['cache_key'], res, state['cache_ttl'])
+        elif method_name != 'get' and resource_name and self.cache is not None:
+            # Persistent cache keeps only immutable responses, so writes don't invalidate it
+            self.cache.invalidate(resource_name)
+
+        return res
+
+    # resource_name - name of API_SCHEMA resource, GET responses of it can be cached or revalidated,
+    # any other request invalidates cached responses of the resource
+    # action_name - name of API_SCHEMA action of the request
+    def make_and_handle_request(self, method_name, path, base_url=None, payload={}, retry_counter=None, plain_text=False, gzip=False, resource_name=None, action_name=None):
         if not base_url:
             base_url = self.base_url
 
+        state = self.prepare_request_state(method_name, base_url, path, payload, resource_name, action_name)
+        if 'response' in state:
+            return state['response']
+
+        # Response headers are needed only to store validators
+        with_headers = 'validators_key' in state
+
+        def request():
+            res = self.request_with_retries(
+                method_name, path, base_url, payload, retry_counter, plain_text, gzip, state['headers'], resource_name,
+                with_headers=with_headers
+            )
+            res, headers = res if with_headers else (res, None)
+            return self.resolve_not_modified(state, res), headers
+
+        coalescing_key = self.coalescing_key(method_name, base_url, path, payload, plain_text, state['headers'])
+
+        if coalescing_key:
+            (res, headers), shared = self.coalescing.do(coalescing_key, request)
+            if shared:
+                # Validators of shared response are stored by the caller who made the request
+                state.pop('validators_key', None)
+        else:
+            res, headers = request()
+
+        return self.complete_request_state(state, method_name, resource_name, res, headers)
+
+    # with_headers - return (response, response headers)
+    def request_with_retries(self, method_name, path, base_url, payload={}, retry_counter=None, plain_text=False, gzip=False, headers=None, resource_name=None, with_headers=False):
         if retry_counter is None:
-            # Allow retries for get request, because it deosn't modify any data on server
-            if method_name == 'get':
-                retry_counter = self.RetryCounter(self)
-            # But don't allow to retry another (POST, PUT, DELETE, etc) requests
-            else:
-                retry_counter = self.RetryCounter.none()
+            retry_counter = self.default_retry_counter(method_name)
+
+        self.check_circuit(method_name, path, base_url, payload)
 
         try:
             self.log_request(method_name, path, payload)
-            with self.request(method_name, path, base_url, payload, gzip) as res:
+            with self.count_outcome(base_url), self.limit_request(method_name, resource_name), \
+                    self.request(method_name, path, base_url, payload, gzip, headers) as res:
+                self.local.response_size = len(res.content)
                 self.log_response(method_name, path, res)
-                return self.handle_response(res, plain_text=plain_text)
-        except self.RetryableApiError as e:
-            if retry_counter.is_retries_available():
-                time.sleep(self.retry_wait_seconds)
-                return self.make_and_handle_request(method_name, path, base_url, payload, retry_counter.count_retry(e))
+                body = self.handle_response(res, plain_text=plain_text, conditional=self.is_conditional(headers))
+                return (body, res.headers) if with_headers else body
+        except (self.RetryableApiError, self.NetworkError) as e:
+            try:
+                wait = retry_counter.retry_wait(e)
+            except self.RetryBudgetExhaustedError as budget_error:
+                e, wait = budget_error, None
+
+            if wait is not None:
+                time.sleep(wait)
+                return self.request_with_retries(
+                    method_name, path, base_url, payload, retry_counter.count_retry(e), plain_text, gzip, headers, resource_name,
+                    with_headers=with_headers
+                )
             else:
                 e.add_request_details(method_name, path, payload)
                 raise e
@@ -354,33 +944,365 @@ class HubApiClient:
             e.add_request_details(method_name, path, payload)
             raise e
 
-    def get(self, path, payload = {}):
-        return self.make_and_handle_request('get', path, payload=payload)
+    # Records outcome of a request for retry budget and circuit breaker, whatever exception ends it,
+    # so half-open trial request always gives back its slot
+    @contextmanager
+    def count_outcome(self, base_url):
+        try:
+            yield
+        except (self.RetryableApiError, self.NetworkError):
+            self.count_failure(base_url)
+            raise
+        except self.BaseError:
+            self.count_available(base_url)
+            raise
+        except Exception:
+            # Transport errors which aren't converted to NetworkError, e.g. ChunkedEncodingError or ReadTimeout
+            self.count_failure(base_url)
+            raise
+        except BaseException:
+            # Cancellation or interrupt says nothing about the service
+            self.count_released(base_url)
+            raise
+        else:
+            self.count_success(base_url)
 
-    def get_paginated_response(self, full_path, limit=50, offset=0, **kwargs):
-        args = { 'limit': limit, 'offset': offset }
-        args.update(kwargs)
-        return self.get(full_path, args)
+    # Waits for rate limits and a slot of adaptive concurrency, the slot is released when response is handled
+    @contextmanager
+    def limit_request(self, method_name, resource_name):
+        if self.rate_limiter is not None:
+            delay = self.rate_limiter.reserve(method_name, resource_name)
+            if delay > 0:
+                time.sleep(delay)
 
-    def iterate_all_resource_pages(self, method_name, handler, **kwargs):
-        offset = 0
-        while True:
-            method = getattr(self, method_name)
+        if self.adaptive_concurrency is None:
+            yield
+            return
+
+        self.adaptive_concurrency.acquire()
+        success = None
+
+        try:
+            yield
+            success = True
+        except self.RetryableApiError:
+            success = False
+            raise
+        finally:
+            self.adaptive_concurrency.release(success)
+
+    def circuit_breaker(self, base_url):
+        if self.circuit_breaker_options is None:
+            return None
+
+        with self.circuit_breakers_lock:
+            breaker = self.circuit_breakers.get(base_url)
+
+            if breaker is None:
+                breaker = CircuitBreaker(name=base_url, on_state_change=self.on_circuit_state_change, **self.circuit_breaker_options)
+                self.circuit_breakers[base_url] = breaker
+
+            return breaker
+
+    def check_circuit(self, method_name, path, base_url, payload):
+        breaker = self.circuit_breaker(base_url)
+
+        if breaker is not None and not breaker.allow():
+            error = self.CircuitOpenError('Circuit breaker of {base_url} is open'.format(base_url=base_url))
+            error.add_request_details(method_name, path, payload)
+            raise error
+
+    def count_success(self, base_url):
+        if self.retry_budget is not None:
+            self.retry_budget.deposit()
+
+        self.count_available(base_url)
+
+    # Error responses like 400 or 404 mean that service is available too
+    def count_available(self, base_url):
+        breaker = self.circuit_breaker(base_url)
+        if breaker is not None:
+            breaker.record_success()
+
+    def count_failure(self, base_url):
+        breaker = self.circuit_breaker(base_url)
+        if breaker is not None:
+            breaker.record_failure()
+
+    def count_released(self, base_url):
+        breaker = self.circuit_breaker(base_url)
+        if breaker is not None:
+            breaker.release()
+
+    # Size of the last response body received in current thread
+    def last_response_size(self):
+        return getattr(self.local, 'response_size', 0)
+
+    def get(self, path, payload = {}, resource_name=None, action_name=None, retry_counter=None):
+        return self.make_and_handle_request(
+            'get', path, payload=payload, retry_counter=retry_counter, resource_name=resource_name, action_name=action_name
+        )
 
-            args = { 'offset': offset }
+    # With parallel_workers fetches all pages starting from offset concurrently
+    # and returns them merged in one response
+    def get_paginated_response(self, full_path, limit=DEFAULT_PAGE_LIMIT, offset=0, parallel_workers=0, keep_order=True, dedupe=False, resource_name=None, retry_counter=None, **kwargs):
+        def fetch_page(limit, offset):
+            args = { 'limit': limit, 'offset': offset }
             args.update(kwargs)
+            return self.get(full_path, args, resource_name=resource_name, action_name='index', retry_counter=retry_counter)
+
+        if parallel_workers > 0:
+            items = []
+            self.shard_all_resource_pages(fetch_page, items.append, parallel_workers, limit, offset, keep_order, dedupe)
+            return self.merged_pages_response(items, offset)
+        else:
+            return fetch_page(limit, offset)
 
-            res = method(**args)
+    def merged_pages_response(self, items, offset):
+        pagination = { 'limit': len(items), 'offset': offset, 'count': len(items), 'total': offset + len(items) }
+        return { 'data': items, 'meta': { 'status': 200, 'pagination': pagination } }
 
-            for item in res['data']:
+    def iterate_all_resource_pages(self, method_name, handler, prefetch_pages=0, parallel_workers=0, keep_order=True, dedupe=False, **kwargs):
+        self.check_page_fetch_options(prefetch_pages, parallel_workers, kwargs)
+
+        if parallel_workers > 0:
+            method = getattr(self, method_name)
+            limit = kwargs.pop('limit', self.DEFAULT_PAGE_LIMIT)
+
+            def fetch_page(limit, offset):
+                return method(limit=limit, offset=offset, **kwargs)
+
+            return self.shard_all_resource_pages(fetch_page, handler, parallel_workers, limit, 0, keep_order, dedupe)
+
+        if prefetch_pages > 0:
+            return self.prefetch_all_resource_pages(method_name, handler, prefetch_pages, **kwargs)
+
+        for item in self.stream_resource_items(method_name, **kwargs):
+            handler(item)
+
+    # Adaptive page size and cursor pagination are supported only by sequential fetch of pages,
+    # their options are removed from kwargs of prefetched and parallel pages, so they aren't sent as request params
+    def check_page_fetch_options(self, prefetch_pages, parallel_workers, kwargs):
+        if prefetch_pages > 0 or parallel_workers > 0:
+            if kwargs.pop('adaptive', None):
+                raise ValueError('adaptive page size is not supported with prefetch_pages or parallel_workers')
+            if kwargs.pop('pagination', 'offset') == 'cursor':
+                raise ValueError("pagination='cursor' is not supported with prefetch_pages or parallel_workers")
+
+    # Splits offsets space by total count from the first page and fetches pages on `workers` threads.
+    # keep_order - handle items in offsets order, otherwise in order of pages arrival
+    # dedupe - skip items with already handled id, they can move between pages while collection changes
+    def shard_all_resource_pages(self, fetch_page, handler, workers, limit, offset=0, keep_order=True, dedupe=False):
+        seen_ids = set() if dedupe else None
+
+        def handle_page(res):
+            for item in self.unseen_items(res['data'], seen_ids):
                 handler(item)
 
-            count = res['meta']['pagination']['count']
+        res = fetch_page(limit, offset)
+        pagination = res['meta']['pagination']
+        handle_page(res)
+
+        limit = pagination.get('limit', limit)
+        total = pagination.get('total')
+
+        if total is None:
+            # Nothing to shard without total, walk pages one by one
+            while not self.is_last_page(pagination, offset, limit):
+                offset += pagination['count']
+                res = fetch_page(limit, offset)
+                pagination = res['meta']['pagination']
+                handle_page(res)
+
+            return
+
+        next_offset = offset + limit
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Offsets order, at most 2 pages per worker are fetched ahead
+            pending = deque()
+
+            def schedule():
+                nonlocal next_offset
+                while len(pending) < workers * 2 and next_offset < total:
+                    pending.append(executor.submit(fetch_page, limit, next_offset))
+                    next_offset += limit
+
+            schedule()
+
+            try:
+                while pending:
+                    if keep_order:
+                        future = pending.popleft()
+                    else:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        future = next(iter(done))
+                        pending.remove(future)
+
+                    res = future.result()
+                    # Collection has grown during the walk, fetch new tail too
+                    total = max(total, res['meta']['pagination'].get('total') or total)
+
+                    handle_page(res)
+                    schedule()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    # Skips items with id from seen_ids (if it is set) and remembers ids of new ones, items without id are never skipped
+    def unseen_items(self, items, seen_ids):
+        for item in items:
+            if seen_ids is not None and item.get('id') is not None:
+                if item['id'] in seen_ids:
+                    continue
+                seen_ids.add(item['id'])
+
+            yield item
+
+    # Last page is detected by pagination meta, so there is no trailing request for an empty page
+    def is_last_page(self, pagination, offset, limit):
+        count = pagination['count']
+        total = pagination.get('total')
+
+        if total is not None:
+            return count == 0 or offset + count >= total
+        else:
+            # Server can cap requested limit, it returns applied one in meta
+            return count < pagination.get('limit', limit)
+
+    # Lazily yields items page by page, next page is requested only when consumer needs it
+    # adaptive - optional AdaptivePageSize (or True for defaults) to pick limit for every page
+    # pagination - 'offset' or 'cursor' (see stream_resource_items_by_cursor)
+    def stream_resource_items(self, method_name, limit=DEFAULT_PAGE_LIMIT, offset=0, adaptive=None, pagination='offset', **kwargs):
+        if pagination == 'cursor':
+            yield from self.stream_resource_items_by_cursor(method_name, limit, **kwargs)
+            return
+
+        method = getattr(self, method_name)
+
+        if adaptive is True:
+            adaptive = self.AdaptivePageSize(limit=limit)
+
+        while True:
+            if adaptive:
+                limit = adaptive.limit
+                started_at = time.monotonic()
+
+                try:
+                    res = method(limit=limit, offset=offset, retry_counter=self.adaptive_page_retry_counter(), **kwargs)
+                except self.RetryableApiError as e:
+                    if adaptive.record_error(e):
+                        continue
+                    # Page can't be smaller, it's requested with usual retries
+                    res = method(limit=limit, offset=offset, **kwargs)
+
+                adaptive.record(time.monotonic() - started_at, self.last_response_size())
+
+                if self.debug:
+                    print('HAC.Page: limit {} next limit {}'.format(limit, adaptive.limit))
+            else:
+                res = method(limit=limit, offset=offset, **kwargs)
+
+            for item in res['data']:
+                yield item
+
+            pagination = res['meta']['pagination']
+
+            if self.is_last_page(pagination, offset, limit):
+                break
+
+            offset += pagination['count']
+
+    # Network errors of adaptive page are retried as usual, but RetryableApiError is raised at once
+    # to retry with smaller page instead of waiting for the same one
+    def adaptive_page_retry_counter(self):
+        retry_counter = self.RetryCounter(self)
+        retry_counter.retries_left = 0
+        return retry_counter
+
+    # Pages by server cursor (`meta.pagination.next_cursor`) if server returns it,
+    # otherwise by id of the last seen item (`after_id` param, server should order items by id).
+    # If server ignores `after_id` and returns already seen items, walk continues with offsets
+    def stream_resource_items_by_cursor(self, method_name, limit=DEFAULT_PAGE_LIMIT, **kwargs):
+        method = getattr(self, method_name)
 
-            if count > 0:
-                offset += count
+        cursor_args = {}
+        previous_ids = set()
+        seen_count = 0
+
+        while True:
+            args = dict(kwargs, **cursor_args)
+            res = method(limit=limit, **args)
+
+            data = res['data']
+            pagination = res['meta']['pagination']
+            ids = set(item.get('id') for item in data) - set([None])
+
+            if 'after_id' in cursor_args and previous_ids & ids:
+                yield from self.stream_resource_items(method_name, limit=limit, offset=seen_count, **kwargs)
+                return
+
+            for item in data:
+                yield item
+
+            seen_count += len(data)
+            previous_ids = ids
+
+            if 'next_cursor' in pagination:
+                if not data or not pagination['next_cursor']:
+                    break
+
+                cursor_args = { 'cursor': pagination['next_cursor'] }
             else:
-                break;
+                if len(data) < pagination.get('limit', limit):
+                    break
+
+                cursor_args = { 'after_id': data[-1]['id'] }
+
+    # Fetches next `prefetch_pages` pages in background while handler consumes current page,
+    # so at most prefetch_pages + 1 pages are kept in memory
+    def prefetch_all_resource_pages(self, method_name, handler, prefetch_pages, limit=DEFAULT_PAGE_LIMIT, **kwargs):
+        method = getattr(self, method_name)
+
+        with ThreadPoolExecutor(max_workers=prefetch_pages) as executor:
+            def fetch(offset):
+                return offset, executor.submit(method, limit=limit, offset=offset, **kwargs)
+
+            pages = deque([fetch(0)])
+            next_offset = limit
+
+            try:
+                while pages:
+                    offset, future = pages.popleft()
+                    res = future.result()
+
+                    pagination = res['meta']['pagination']
+                    count = pagination['count']
+                    total = pagination.get('total')
+
+                    if count < limit:
+                        # It is the last page or server caps page size,
+                        # in the last case already prefetched offsets are wrong
+                        for _, pending in pages:
+                            pending.cancel()
+                        pages.clear()
+
+                        if count == 0 or (total is not None and offset + count >= total):
+                            total = offset + count
+                        else:
+                            limit = count
+
+                        next_offset = offset + count
+
+                    while len(pages) < prefetch_pages and (total is None or next_offset < total):
+                        pages.append(fetch(next_offset))
+                        next_offset += limit
+
+                    for item in res['data']:
+                        handler(item)
+            finally:
+                for _, pending in pages:
+                    pending.cancel()
 
     def build_full_resource_path(self, resource_name, parent_resource_name):
         if parent_resource_name:
@@ -412,6 +1334,15 @@ class HubApiClient:
                 else:
                     raise self.DSLError('Unsupported action in DSL: `{action_name}`'.format(action_name=action_name))
 
+    # Replaces DataFrame or NumPy array in `records` with lists of values, `features` are taken from columns if not passed
+    def tabular_payload(self, kwargs):
+        if not is_tabular(kwargs.get('records')):
+            return kwargs
+
+        kwargs = kwargs.copy()
+        kwargs['features'], kwargs['records'] = tabular_records(kwargs['records'], kwargs.get('features'))
+        return kwargs
+
     def format_full_resource_path(self, path_template, parent_resource_name, kwargs):
         if parent_resource_name:
             parent_id_key = parent_resource_name + '_id'
@@ -433,39 +1364,61 @@ class HubApiClient:
         else:
             return 's'
 
+    def register_action(self, proc_name, proc):
+        setattr(self.__class__, proc_name, proc)
+
     def define_action(self, action_name, path_template, resource_name, parent_resource_name, http_method=None):
         if action_name == 'index':
             ending = self.plural_ending(resource_name)
             index_proc_name = 'get_{resource_name}{ending}'.format(resource_name=resource_name, ending=ending)
             iterate_proc_name = 'iterate_all_{resource_name}{ending}'.format(resource_name=resource_name, ending=ending)
+            stream_proc_name = 'stream_{resource_name}{ending}'.format(resource_name=resource_name, ending=ending)
+
+            cursor_pagination = self.API_SCHEMA[resource_name].get('cursor_pagination', False)
+
+            # Cursor pagination is requested with pagination='cursor', resources without it use offsets
+            def pagination_options(kwargs):
+                if not cursor_pagination and kwargs.get('pagination') == 'cursor':
+                    kwargs['pagination'] = 'offset'
+                return kwargs
 
             def index(self, **kwargs):
                 path = self.format_full_resource_path(path_template, parent_resource_name, kwargs)
-                return self.get_paginated_response(path, **kwargs)
+                return self.get_paginated_response(path, resource_name=resource_name, **kwargs)
 
             def iterate(self, handler, **kwargs):
-                return self.iterate_all_resource_pages(index_proc_name, handler, **kwargs)
+                return self.iterate_all_resource_pages(index_proc_name, handler, **pagination_options(kwargs))
 
-            setattr(self.__class__, index_proc_name, index)
-            setattr(self.__class__, iterate_proc_name, iterate)
+            def stream(self, **kwargs):
+                return self.stream_resource_items(index_proc_name, **pagination_options(kwargs))
+
+            self.register_action(index_proc_name, index)
+            self.register_action(iterate_proc_name, iterate)
+            self.register_action(stream_proc_name, stream)
 
         elif action_name == 'show':
             show_proc_name = 'get_{resource_name}'.format(resource_name=resource_name)
 
             def show(self, id, **kwargs):
                 path = self.format_full_resource_path(path_template, parent_resource_name, kwargs)
-                return self.make_and_handle_request('get', '{path}/{id}'.format(path=path, id=id))
+                return self.make_and_handle_request(
+                    'get', '{path}/{id}'.format(path=path, id=id), resource_name=resource_name, action_name='show'
+                )
 
-            setattr(self.__class__, show_proc_name, show)
+            self.register_action(show_proc_name, show)
 
         elif action_name == 'create':
             create_proc_name = 'create_{resource_name}'.format(resource_name=resource_name)
 
+            tabular = self.API_SCHEMA[resource_name].get('tabular', False)
+
             def create(self, **kwargs):
                 path = self.format_full_resource_path(path_template, parent_resource_name, kwargs)
-                return self.make_and_handle_request('post', path, payload=kwargs)
+                if tabular:
+                    kwargs = self.tabular_payload(kwargs)
+                return self.make_and_handle_request('post', path, payload=kwargs, resource_name=resource_name)
 
-            setattr(self.__class__, create_proc_name, create)
+            self.register_action(create_proc_name, create)
 
         elif action_name == 'update':
             update_proc_name = 'update_{resource_name}'.format(resource_name=resource_name)
@@ -474,17 +1427,17 @@ class HubApiClient:
                 path = self.format_full_resource_path(path_template, parent_resource_name, kwargs)
                 if id:
                     path='{path}/{id}'.format(path=path, id=id)
-                return self.make_and_handle_request('patch', path, payload=kwargs)
+                return self.make_and_handle_request('patch', path, payload=kwargs, resource_name=resource_name)
 
-            setattr(self.__class__, update_proc_name, update)
+            self.register_action(update_proc_name, update)
         elif action_name == 'delete':
             delete_proc_name = 'delete_{resource_name}'.format(resource_name=resource_name)
 
             def delete(self, id):
                 path = self.format_full_resource_path(path_template, parent_resource_name, {})
-                return self.make_and_handle_request('delete', '{path}/{id}'.format(path=path, id=id))
+                return self.make_and_handle_request('delete', '{path}/{id}'.format(path=path, id=id), resource_name=resource_name)
 
-            setattr(self.__class__, delete_proc_name, delete)
+            self.register_action(delete_proc_name, delete)
         elif http_method:
             custom_proc_name = '{action_name}_{resource_name}'.format(
                 action_name=action_name,
@@ -494,13 +1447,262 @@ class HubApiClient:
             def custom_action(self, id, **kwargs):
                 path = self.format_full_resource_path(path_template, parent_resource_name, kwargs)
                 path = '{path}/{id}/{action_name}'.format(path=path, id=id, action_name=action_name)
-                return self.make_and_handle_request(http_method, path, payload=kwargs)
+                return self.make_and_handle_request(http_method, path, payload=kwargs, resource_name=resource_name)
 
-            setattr(self.__class__, custom_proc_name, custom_action)
+            self.register_action(custom_proc_name, custom_action)
         else:
             raise self.DSLError('Unsupported REST action `{name}`'.format(name=action_name))
 
 
+    # Concurrent calls
+
+    # Any error of a call is captured, transport errors like requests ReadTimeout too
+    def batch_call(self, method_name, kwargs):
+        try:
+            return self.BatchResult(result=getattr(self, method_name)(**kwargs))
+        except Exception as e:
+            return self.BatchResult(error=e)
+
+    # Runs independent calls concurrently over pooled connections
+    # calls - list of (method_name, kwargs) pairs, e.g. [('get_trial', {'id': 1}), ('get_pipeline', {'id': 2})]
+    # Returns list of BatchResult in order of calls
+    def batch(self, calls, max_workers=None):
+        calls = list(calls)
+        if not calls:
+            return []
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.pool_maxsize) as executor:
+            futures = [executor.submit(self.batch_call, method_name, kwargs) for method_name, kwargs in calls]
+            return [future.result() for future in futures]
+
+    # Calls the same method for each kwargs concurrently, e.g. client.map('get_trial', [{'id': 1}, {'id': 2}])
+    def map(self, method_name, kwargs_list, max_workers=None):
+        return self.batch([(method_name, kwargs) for kwargs in kwargs_list], max_workers=max_workers)
+
+    # Bulk uploads
+
+    # Splits iterable of rows into lists of at most `chunk_rows` rows and, if set, `chunk_bytes` bytes of encoded rows
+    def chunk_rows(self, rows, chunk_rows=1000, chunk_bytes=None):
+        chunk = []
+        size = 0
+
+        for row in rows:
+            row_size = len(self.codec.dumps(row)) if chunk_bytes else 0
+
+            if chunk and (len(chunk) >= chunk_rows or (chunk_bytes and size + row_size > chunk_bytes)):
+                yield chunk
+                chunk = []
+                size = 0
+
+            chunk.append(row)
+            size += row_size
+
+        if chunk:
+            yield chunk
+
+    # Calls `method_name` (or callable) for each chunk (passed as `rows_param`, other params are the same for all chunks) concurrently,
+    # at most `max_in_flight` chunks are read from `chunks` at once, so memory is bounded for large iterables
+    # Chunks failed with RetryableApiError or NetworkError are retried up to `chunk_retries` times, other errors are captured
+    # on_chunk(index, rows_count, result) is called when chunk is done
+    # Returns list of BatchResult in order of chunks
+    def upload_chunks(self, method_name, chunks, rows_param, max_in_flight=None, chunk_retries=2, on_chunk=None, **kwargs):
+        max_in_flight = max_in_flight or self.pool_maxsize
+        method = getattr(self, method_name) if isinstance(method_name, str) else method_name
+
+        def upload(chunk):
+            params = dict(kwargs, **{ rows_param: chunk })
+            retry_counter = self.RetryCounter(self)
+            attempt = 0
+
+            while True:
+                try:
+                    return self.BatchResult(result=method(**params))
+                except (self.RetryableApiError, self.NetworkError) as e:
+                    wait, error = self.chunk_retry_wait(retry_counter, e, attempt, chunk_retries)
+                    if wait is None:
+                        return self.BatchResult(error=error)
+
+                    time.sleep(wait)
+                    attempt += 1
+                except Exception as e:
+                    # Other errors (including transport errors not converted to NetworkError) fail only this chunk
+                    return self.BatchResult(error=e)
+
+        results = {}
+        pending = {}
+        chunks = enumerate(chunks)
+
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            while True:
+                for index, chunk in chunks:
+                    pending[executor.submit(upload, chunk)] = (index, len(chunk))
+                    if len(pending) >= max_in_flight:
+                        break
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    index, rows_count = pending.pop(future)
+                    results[index] = future.result()
+
+                    if on_chunk:
+                        on_chunk(index, rows_count, results[index])
+
+        return [results[index] for index in range(len(results))]
+
+    # Returns (wait, error) for failed chunk upload, wait is None if chunk shouldn't be retried.
+    # Chunk retries follow retry policies and retry budget like retries of requests, at most `chunk_retries` of them,
+    # errors of exhausted retry budget and open circuit aren't retried
+    def chunk_retry_wait(self, retry_counter, error, attempt, chunk_retries):
+        if attempt >= chunk_retries or isinstance(error, (self.RetryBudgetExhaustedError, self.CircuitOpenError)):
+            return None, error
+
+        try:
+            wait = retry_counter.retry_wait(error)
+        except self.RetryBudgetExhaustedError as budget_error:
+            return None, budget_error
+
+        if wait is not None:
+            retry_counter.count_retry(error)
+
+        return wait, error
+
+    # Creates predictions for large iterable of records (or DataFrame) by chunks, returns list of BatchResult per chunk in order of records
+    # DataFrame or NumPy array is converted to records by `chunk_rows` rows while chunks are uploaded
+    def bulk_create_predictions(self, pipeline_id, records, features=None, chunk_rows=1000, chunk_bytes=None, max_in_flight=None, chunk_retries=2, **kwargs):
+        if is_tabular(records):
+            features, records = iter_tabular_records(records, features, chunk_rows)
+
+        return self.upload_chunks(
+            'create_prediction', self.chunk_rows(records, chunk_rows, chunk_bytes), 'records', max_in_flight, chunk_retries,
+            pipeline_id=pipeline_id, features=features, **kwargs
+        )
+
+    def bulk_create_endpoint_predictions(self, endpoint_id, records, features=None, chunk_rows=1000, chunk_bytes=None, max_in_flight=None, chunk_retries=2, **kwargs):
+        if is_tabular(records):
+            features, records = iter_tabular_records(records, features, chunk_rows)
+
+        return self.upload_chunks(
+            'create_endpoint_prediction', self.chunk_rows(records, chunk_rows, chunk_bytes), 'records', max_in_flight, chunk_retries,
+            endpoint_id=endpoint_id, features=features, **kwargs
+        )
+
+    # Reads actuals from iterable of dicts or CSV / NDJSON file and uploads them by batches of `batch_rows` rows
+    # (and `batch_bytes` bytes if set) with at most `max_in_flight` concurrent requests
+    # format - 'csv' or 'ndjson', by default by file extension, CSV values are sent as strings
+    # compress - send batches gzipped (batches smaller than `compression_threshold` are sent as is)
+    # on_batch(report, index, rows_count, result) is called after each batch
+    # Returns IngestReport with rows per second and failed batches
+    def ingest_actuals(self, source, pipeline_id=None, endpoint_id=None, format=None, batch_rows=10000, batch_bytes=None,
+                       compress=False, max_in_flight=None, chunk_retries=2, on_batch=None, **kwargs):
+        create, on_chunk, report = self.prepare_ingest_actuals(pipeline_id, endpoint_id, compress, on_batch, kwargs)
+        self.upload_chunks(
+            create, self.chunk_rows(self.read_rows(source, format), batch_rows, batch_bytes), 'actuals',
+            max_in_flight, chunk_retries, on_chunk, **kwargs
+        )
+
+        return report
+
+    def prepare_ingest_actuals(self, pipeline_id, endpoint_id, compress, on_batch, kwargs):
+        if endpoint_id:
+            path = '{api_prefix}/endpoints/{id}/actuals'.format(api_prefix=self.API_PREFIX, id=endpoint_id)
+        elif pipeline_id:
+            path = '{api_prefix}/actuals'.format(api_prefix=self.API_PREFIX)
+            kwargs['pipeline_id'] = pipeline_id
+        else:
+            raise self.MissingParamError('pipeline_id or endpoint_id parameter is required')
+
+        report = self.IngestReport()
+
+        def create(**payload):
+            return self.make_and_handle_request('post', path, payload=payload, gzip=compress, resource_name='actual')
+
+        def on_chunk(index, rows_count, result):
+            report.record(index, rows_count, result)
+
+            if on_batch:
+                on_batch(report, index, rows_count, result)
+
+        return create, on_chunk, report
+
+    def read_rows(self, source, format=None):
+        if not isinstance(source, str):
+            yield from source
+            return
+
+        format = format or ('csv' if source.lower().endswith('.csv') else 'ndjson')
+
+        with open(source, newline='') as file:
+            if format == 'csv':
+                yield from csv.DictReader(file)
+            else:
+                for line in file:
+                    if line.strip():
+                        yield self.codec.loads(line)
+
+    # Waiting for server-side jobs
+
+    # Statuses after which server-side jobs don't change
+    DEFAULT_WAIT_STATUSES = ['done', 'error', 'completed', 'success', 'failure', 'interrupted']
+
+    # Polls `get_<resource>(id)` (or `get_status(object=resource, id=id)` for objects not in API_SCHEMA, e.g. 'Project')
+    # until its status is one of `until` statuses (or `until(data)` is True), with jittered exponential backoff
+    # until - list of statuses or callable, by default DEFAULT_WAIT_STATUSES
+    # deadline - max seconds to wait, then WaitTimeoutError is raised
+    # backoff - ExponentialBackoff, by default `poll_backoff` of the client
+    # id can be a list of ids, then list of responses is returned in the same order
+    def wait_for(self, resource, id, until=None, deadline=None, backoff=None):
+        futures = self.wait_for_future(resource, id, until, deadline, backoff)
+
+        if isinstance(futures, list):
+            return [future.result() for future in futures]
+
+        return futures.result()
+
+    # Same as wait_for, but returns future (or list of futures) of the last response without blocking
+    def wait_for_future(self, resource, id, until=None, deadline=None, backoff=None):
+        if isinstance(id, (list, tuple)):
+            return [self.wait_for_future(resource, one_id, until, deadline, backoff) for one_id in id]
+
+        poller = self.get_poller()
+
+        return poller.submit(
+            self.wait_poll(resource, id),
+            self.wait_condition(until),
+            backoff or self.poll_backoff,
+            deadline=poller.clock() + deadline if deadline is not None else None,
+            timeout_error=lambda res: self.wait_timeout_error(resource, id, deadline, res)
+        )
+
+    def get_poller(self):
+        with self.poller_lock:
+            if self.poller is None:
+                self.poller = Poller(max_workers=self.poll_workers)
+
+            return self.poller
+
+    def wait_poll(self, resource, id):
+        if resource in self.API_SCHEMA:
+            return lambda: getattr(self, 'get_' + resource)(id)
+
+        return lambda: self.get_status(object=resource, id=id)
+
+    def wait_condition(self, until):
+        if callable(until):
+            return lambda res: until(res['data'])
+
+        statuses = until if until is not None else self.DEFAULT_WAIT_STATUSES
+        return lambda res: res['data'].get('status') in statuses
+
+    def wait_timeout_error(self, resource, id, deadline, res):
+        message = '{resource} {id} is still {status} after {deadline} seconds'.format(
+            resource=resource, id=id, status=res['data'].get('status'), deadline=deadline
+        )
+        return self.WaitTimeoutError(message, res)
+
     # Deviations, not pure RESTfull endpoints
 
     # Updates a bunch of trials for project run
@@ -518,6 +1720,108 @@ class HubApiClient:
         path = '{api_prefix}/status'.format(api_prefix=self.API_PREFIX)
         return self.make_and_handle_request('get', path, payload={'object': object, 'id': id})
 
+    # Returns {(object, id): status} for list of (object, id) pairs, e.g. [('Pipeline', 1), ('ClusterTask', 25)]
+    # Ids of one object type are requested at once (by `status_batch_size`), if server doesn't support
+    # multi-id form for the object type, its statuses are requested concurrently one by one
+    # errors - optional dict, it gets {(object, id): error} for ids which single requests failed (e.g. 404 of deleted object),
+    # these ids are left out of result, without it the first error is raised
+    def get_statuses(self, objects, errors=None):
+        statuses = {}
+
+        for object, ids in self.group_status_objects(objects):
+            if self.multi_status_support.get(object, True):
+                object_statuses = self.get_multi_statuses(object, ids)
+                if object_statuses is not None:
+                    statuses.update(object_statuses)
+                    continue
+
+            results = self.map('get_status', [{ 'object': object, 'id': id } for id in ids])
+            statuses.update(self.parse_single_statuses(object, ids, results, errors))
+
+        return statuses
+
+    # Returns list of (object, id, previous_status, status) for objects which status changed since the previous call,
+    # previous_status is None for objects seen first time
+    def get_status_changes(self, objects, errors=None):
+        return self.record_status_changes(self.get_statuses(objects, errors))
+
+    def get_multi_statuses(self, object, ids):
+        path = '{api_prefix}/status'.format(api_prefix=self.API_PREFIX)
+        statuses = {}
+
+        for offset in range(0, len(ids), self.status_batch_size):
+            chunk = ids[offset:offset + self.status_batch_size]
+
+            try:
+                res = self.make_and_handle_request('get', path, payload={ 'object': object, 'ids': chunk })
+            except (self.InvalidParamsError, self.FatalApiError) as e:
+                if not self.is_multi_status_unsupported(e):
+                    raise
+                res = None
+
+            chunk_statuses = self.parse_multi_statuses(object, chunk, res)
+            if chunk_statuses is None:
+                self.multi_status_support[object] = False
+                return None
+
+            statuses.update(chunk_statuses)
+
+        self.multi_status_support[object] = True
+        return statuses
+
+    # Invalid params, 404 and 405 of multi-id request mean that server doesn't support it
+    def is_multi_status_unsupported(self, error):
+        return isinstance(error, self.InvalidParamsError) or error.status_code in (404, 405)
+
+    def group_status_objects(self, objects):
+        groups = {}
+
+        for object, id in objects:
+            ids = groups.setdefault(object, [])
+            if id not in ids:
+                ids.append(id)
+
+        return groups.items()
+
+    # Returns None if response is not a list of statuses for all requested ids
+    def parse_multi_statuses(self, object, ids, res):
+        if res is None or not isinstance(res.get('data'), list):
+            return None
+
+        statuses = { str(item.get('id')): item.get('status') for item in res['data'] }
+        if not all(str(id) in statuses for id in ids):
+            return None
+
+        return { (object, id): statuses[str(id)] for id in ids }
+
+    # results - BatchResult of get_status for each id
+    def parse_single_statuses(self, object, ids, results, errors=None):
+        statuses = {}
+
+        for id, result in zip(ids, results):
+            if result.ok:
+                statuses[(object, id)] = result.result['data']['status']
+            elif errors is not None:
+                errors[(object, id)] = result.error
+            else:
+                result.unwrap()
+
+        return statuses
+
+    def record_status_changes(self, statuses):
+        with self.statuses_lock:
+            changes = []
+
+            for (object, id), status in statuses.items():
+                previous_status = self.last_statuses.get((object, id))
+
+                if previous_status != status:
+                    changes.append((object, id, previous_status, status))
+
+            self.last_statuses.update(statuses)
+
+        return changes
+
     def delete_actuals(self, **kwargs):
         path = '{api_prefix}/actuals'.format(api_prefix=self.API_PREFIX)
         return self.make_and_handle_request('delete', path, payload=kwargs)
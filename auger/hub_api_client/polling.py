@@ -0,0 +1,133 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Exponential backoff capped with max_wait: initial * factor ** attempt
+# Jitter randomly shortens each wait by up to that fraction, so many pollers don't hit API in lockstep
+class ExponentialBackoff:
+    def __init__(self, initial=1.0, factor=2.0, max_wait=30.0, jitter=0.5, random=random.random):
+        self.initial = initial
+        self.factor = factor
+        self.max_wait = max_wait
+        self.jitter = jitter
+        self.random = random
+
+    def wait(self, attempt):
+        # Exponent is limited to avoid float overflow on long polls
+        wait = min(self.max_wait, self.initial * self.factor ** min(attempt, 64))
+        return wait * (1 - self.jitter * self.random())
+
+
+# Polls many jobs with one scheduler thread, due polls are made by a bounded pool of workers,
+# so waiting for hundreds of jobs doesn't need a sleeping thread per job
+class Poller:
+    class Job:
+        def __init__(self, poll, done, deadline, backoff, timeout_error):
+            self.poll = poll
+            self.done = done
+            self.deadline = deadline
+            self.backoff = backoff
+            self.timeout_error = timeout_error
+            self.attempt = 0
+            self.future = Future()
+
+    def __init__(self, max_workers=10, clock=time.monotonic):
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # Heap of (due_at, seq, job)
+        self.queue = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.closed = False
+
+    # poll() - returns response, done(response) - True when polling should stop
+    # deadline - clock time to give up at, timeout_error(response) - builds error to fail with after deadline
+    # Returns future of the last response
+    def submit(self, poll, done, backoff, deadline=None, timeout_error=TimeoutError):
+        job = self.Job(poll, done, deadline, backoff, timeout_error)
+        self.schedule(job, self.clock())
+        return job.future
+
+    def schedule(self, job, due_at):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('Poller is closed')
+
+            heapq.heappush(self.queue, (due_at, next(self.counter), job))
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='hub-api-poller', daemon=True)
+                self.thread.start()
+
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.closed and (not self.queue or self.queue[0][0] > self.clock()):
+                    self.condition.wait(self.queue[0][0] - self.clock() if self.queue else None)
+
+                if self.closed:
+                    return
+
+                job = heapq.heappop(self.queue)[2]
+
+            if not job.future.done():
+                self.executor.submit(self.poll, job)
+
+    def poll(self, job):
+        try:
+            res = job.poll()
+            finished = job.done(res)
+        except Exception as e:
+            self.complete(job, error=e)
+            return
+
+        if finished:
+            self.complete(job, result=res)
+            return
+
+        now = self.clock()
+        if job.deadline is not None and now >= job.deadline:
+            self.complete(job, error=job.timeout_error(res))
+            return
+
+        due_at = now + job.backoff.wait(job.attempt)
+        job.attempt += 1
+
+        if job.deadline is not None:
+            # Last poll is made right at the deadline
+            due_at = min(due_at, job.deadline)
+
+        try:
+            self.schedule(job, due_at)
+        except RuntimeError as e:
+            self.complete(job, error=e)
+
+    def complete(self, job, result=None, error=None):
+        # Future can be cancelled by consumer in the meantime
+        if job.future.done():
+            return
+
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    # Stops scheduler and cancels pending jobs
+    def close(self):
+        with self.condition:
+            self.closed = True
+            jobs = [job for _, _, job in self.queue]
+            self.queue = []
+            self.condition.notify()
+
+        for job in jobs:
+            job.future.cancel()
+
+        self.executor.shutdown(wait=False)
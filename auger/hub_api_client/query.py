@@ -0,0 +1,58 @@
+import datetime
+import decimal
+
+from urllib.parse import quote
+
+# Converts leaf value to query string value, the same way Rails `to_query` does for JSON types
+def query_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(float(value))
+    # numpy scalars, without importing numpy
+    if hasattr(value, 'item') and hasattr(value, 'dtype'):
+        return query_value(value.item())
+
+    return str(value)
+
+
+# Yields (name, value) pairs of Rails style nested params: `a[b]=1`, `ids[]=1&ids[]=2`
+def query_pairs(value, prefix):
+    if isinstance(value, dict):
+        if not value:
+            yield prefix, ''
+
+        for key in sorted(value, key=str):
+            yield from query_pairs(value[key], '{}[{}]'.format(prefix, key))
+    elif isinstance(value, (list, tuple)):
+        if not value:
+            yield prefix + '[]', ''
+
+        for item in value:
+            yield from query_pairs(item, prefix + '[]')
+    else:
+        yield prefix, query_value(value)
+
+
+# Canonical query string of params: keys are sorted on each level and list items keep their order,
+# so equal params always give the same URL and it can be used as HTTP cache key
+def encode_query(params):
+    pairs = []
+
+    for key in sorted(params, key=str):
+        pairs.extend(query_pairs(params[key], str(key)))
+
+    # Brackets are quoted too, the same as requests and aiohttp send them
+    return '&'.join('{}={}'.format(quote(name, safe=''), quote(value, safe='')) for name, value in pairs)
+
+
+def url_with_query(url, params):
+    query = encode_query(params)
+    if not query:
+        return url
+
+    return url + ('&' if '?' in url else '?') + query
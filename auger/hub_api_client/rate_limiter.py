@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+
+from collections import deque
+
+# Token bucket refilled with `rate` tokens per second, holds at most `burst` tokens
+# Tokens are reserved in advance, so concurrent callers are spaced out instead of woken at once
+class TokenBucket:
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    # Takes a token and returns seconds to wait until it is available
+    def reserve(self):
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+
+# Requests per second limits: `rate` for all requests of the client,
+# `limits` per HTTP method or resource name, e.g. {'post': 10, 'actual': (5, 20)}, values are rate or (rate, burst)
+class RateLimiter:
+    def __init__(self, rate=None, limits=None, clock=time.monotonic):
+        self.bucket = TokenBucket(rate, clock=clock) if rate else None
+        self.buckets = {}
+
+        for name, limit in (limits or {}).items():
+            rate, burst = limit if isinstance(limit, (list, tuple)) else (limit, None)
+            self.buckets[name] = TokenBucket(rate, burst, clock=clock)
+
+    # Returns seconds to wait before request
+    def reserve(self, method_name, resource_name=None):
+        buckets = [self.bucket, self.buckets.get(method_name), self.buckets.get(resource_name)]
+        return max([bucket.reserve() for bucket in buckets if bucket is not None] + [0])
+
+
+# Limit of concurrent requests adjusted with AIMD: it grows by `increase` per `limit` successful requests
+# (about +increase per round of requests) and is multiplied by `decrease` on overload errors
+class AdaptiveConcurrency:
+    def __init__(self, limit=4, min_limit=1, max_limit=64, increase=1.0, decrease=0.5):
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        # Futures of waiting coroutines
+        self.waiters = deque()
+
+    def is_available(self):
+        return self.in_flight < int(self.limit)
+
+    def acquire(self):
+        with self.condition:
+            while not self.is_available():
+                self.condition.wait()
+
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        while True:
+            with self.condition:
+                if self.is_available():
+                    self.in_flight += 1
+                    return
+
+                future = asyncio.get_running_loop().create_future()
+                self.waiters.append(future)
+
+            await future
+
+    # success - True for successful request, False for overload error, None to keep the limit
+    def release(self, success=None):
+        with self.condition:
+            self.in_flight -= 1
+
+            if success is True:
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            elif success is False:
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+
+            self.condition.notify_all()
+            waiters = list(self.waiters)
+            self.waiters.clear()
+
+        for future in waiters:
+            future.get_loop().call_soon_threadsafe(self.wake, future)
+
+    @staticmethod
+    def wake(future):
+        if not future.done():
+            future.set_result(None)
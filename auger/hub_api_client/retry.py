@@ -0,0 +1,101 @@
+import threading
+import time
+
+from email.utils import parsedate_to_datetime
+
+from .polling import ExponentialBackoff
+
+# Decides whether and how long to wait before retry of a failed request
+# max_retries - count of retries, backoff - ExponentialBackoff (jitter=1 for full jitter)
+# max_total_seconds - don't retry if the next attempt would start later than that since the first one
+# Retry-After of server is used instead of backoff wait, unless it is longer than max_retry_after
+class RetryPolicy:
+    def __init__(self, max_retries=5, backoff=None, max_total_seconds=None, retry_after=True, max_retry_after=300):
+        self.max_retries = max_retries
+        self.backoff = backoff or ExponentialBackoff(initial=0.5, max_wait=30, jitter=1)
+        self.max_total_seconds = max_total_seconds
+        self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+
+    # Fixed wait between retries
+    @classmethod
+    def constant(cls, max_retries, seconds, **kwargs):
+        return cls(max_retries=max_retries, backoff=ExponentialBackoff(initial=seconds, factor=1, max_wait=seconds, jitter=0), **kwargs)
+
+    # Returns seconds to wait before retry (attempt is 0 for the first retry) or None if request shouldn't be retried
+    def wait(self, attempt, elapsed, retry_after=None):
+        if attempt >= self.max_retries:
+            return None
+
+        if self.retry_after and retry_after is not None:
+            if self.max_retry_after is not None and retry_after > self.max_retry_after:
+                return None
+            wait = retry_after
+        else:
+            wait = self.backoff.wait(attempt)
+
+        if self.max_total_seconds is not None and elapsed + wait > self.max_total_seconds:
+            return None
+
+        return wait
+
+
+# Retry-After header is either delay in seconds or HTTP date, returns seconds or None
+def parse_retry_after(value, now=time.time):
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+# Token bucket of retries shared by requests of a client (or of all clients in the process):
+# each successful request deposits `ratio` tokens, each retry withdraws one.
+# Bucket starts full and holds at most `max_tokens`, so short bursts of retries are allowed,
+# but sustained retries stay under `ratio` of successful requests
+class RetryBudget:
+    shared_budget = None
+    shared_lock = threading.Lock()
+
+    def __init__(self, ratio=0.1, max_tokens=10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = float(max_tokens)
+        self.lock = threading.Lock()
+        self.retries = 0
+        self.rejected = 0
+
+    # One budget for all clients of the process which use it
+    @classmethod
+    def shared(cls):
+        with cls.shared_lock:
+            if cls.shared_budget is None:
+                cls.shared_budget = cls()
+
+            return cls.shared_budget
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    # Returns False if there are no tokens for retry
+    def withdraw(self):
+        with self.lock:
+            if self.tokens < 1:
+                self.rejected += 1
+                return False
+
+            self.tokens -= 1
+            self.retries += 1
+            return True
+
+    def stats(self):
+        with self.lock:
+            return { 'tokens': self.tokens, 'retries': self.retries, 'rejected': self.rejected }
@@ -0,0 +1,71 @@
+import asyncio
+import copy
+import threading
+
+# Coalesces concurrent identical calls: the first caller (leader) makes the call,
+# callers with the same key wait for it and get a copy of its result or the same error
+class SingleFlight:
+    class Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    # Returns (result, shared), shared is True if result was received from another caller
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = self.Call()
+                self.calls[key] = call
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.event.set()
+        else:
+            call.event.wait()
+
+        if call.error is not None:
+            raise call.error
+
+        return (call.result, False) if leader else (copy.deepcopy(call.result), True)
+
+
+# Same as SingleFlight for coroutines of one event loop
+# Shared call runs in its own task and every caller awaits it shielded,
+# so cancellation of any caller (the first one too) doesn't cancel the others
+class AsyncSingleFlight:
+    def __init__(self):
+        self.calls = {}
+
+    async def do(self, key, fn):
+        task = self.calls.get(key)
+        leader = task is None
+
+        if leader:
+            task = asyncio.ensure_future(fn())
+            self.calls[key] = task
+            task.add_done_callback(lambda task: self.complete(key, task))
+
+        result = await asyncio.shield(task)
+        return (result, False) if leader else (copy.deepcopy(result), True)
+
+    def complete(self, key, task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+
+        # Mark error as retrieved, in case all callers were cancelled
+        if not task.cancelled():
+            task.exception()
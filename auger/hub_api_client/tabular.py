@@ -0,0 +1,73 @@
+# Prediction records from pandas DataFrame or NumPy arrays, without importing pandas or numpy unless such data is passed.
+# Payload stays columnar: feature names once and records as lists of values,
+# missing values (NaN, NaT, None) are replaced with None by vectorized operations
+
+def is_data_frame(value):
+    return hasattr(value, 'columns') and hasattr(value, 'isna') and hasattr(value, 'to_numpy')
+
+
+def is_ndarray(value):
+    return hasattr(value, 'dtype') and hasattr(value, 'shape') and hasattr(value, 'tolist')
+
+
+def is_tabular(value):
+    return is_data_frame(value) or is_ndarray(value)
+
+
+# Column names of DataFrame or structured array, features argument overrides them
+def tabular_features(value, features=None):
+    if is_data_frame(value):
+        return features or [str(column) for column in value.columns]
+    elif value.dtype.names:
+        return features or list(value.dtype.names)
+    else:
+        return features
+
+
+# Returns (features, records), features argument overrides column names
+def tabular_records(value, features=None):
+    features = tabular_features(value, features)
+
+    if is_data_frame(value):
+        records = value.to_numpy(dtype=object, copy=True)
+        records[value.isna().to_numpy()] = None
+        return features, records.tolist()
+
+    import numpy
+
+    if value.dtype.names:
+        records = numpy.empty((len(value), len(value.dtype.names)), dtype=object)
+
+        for index, name in enumerate(value.dtype.names):
+            records[:, index] = value[name]
+            records[missing_mask(numpy, value[name]), index] = None
+
+        return features, records.tolist()
+
+    records = numpy.array(value, dtype=object)
+    records[missing_mask(numpy, value)] = None
+    return features, records.tolist()
+
+
+# Returns (features, rows), rows are converted lazily by slices of `slice_rows` rows,
+# so only one slice of the data is copied at once
+def iter_tabular_records(value, features=None, slice_rows=1000):
+    features = tabular_features(value, features)
+
+    def rows():
+        for start in range(0, len(value), slice_rows):
+            rows_slice = value.iloc[start:start + slice_rows] if is_data_frame(value) else value[start:start + slice_rows]
+            yield from tabular_records(rows_slice, features)[1]
+
+    return features, rows()
+
+
+def missing_mask(numpy, values):
+    if values.dtype.kind in 'fc':
+        return numpy.isnan(values)
+    elif values.dtype.kind in 'mM':
+        return numpy.isnat(values)
+    elif values.dtype.kind == 'O':
+        return numpy.array([value is None or value != value for value in values.flat], dtype=bool).reshape(values.shape)
+    else:
+        return numpy.zeros(values.shape, dtype=bool)
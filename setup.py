@@ -30,11 +30,17 @@ setup(
     packages=[
         'auger.hub_api_client',
     ],
+    python_requires='>=3.8',
     install_requires=[
         'requests',
         'beautifulsoup4',
         'lxml'
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'orjson': ['orjson'],
+        'zstd': ['zstandard'],
+    },
     zip_safe=False,
     cmdclass={
         'verify': VerifyVersionCommand
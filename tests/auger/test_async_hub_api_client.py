@@ -0,0 +1,152 @@
+import unittest
+from mock import patch
+
+from auger.hub_api_client import AsyncHubApiClient
+from tests.auger.test_hub_api_client import FakeCollection
+from tests.vcr_helper import vcr
+
+
+@patch('asyncio.sleep', return_value=None)
+class TestAsyncHubApiClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = AsyncHubApiClient(
+          hub_app_url='http://localhost:5000',
+          retries_count=1,
+          hub_project_api_token='0d5a55cb795f2039922689e647cb3c5d24a0992bf58d941dad864ef7c371f8fc'
+        )
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    @vcr.use_cassette('experiments/show.yaml')
+    async def test_get_experiment(self, sleep_mock):
+        res = await self.client.get_experiment('0138f8da7adf76')
+        self.assertEqual(res['data']['object'], 'experiment')
+
+    @vcr.use_cassette('experiments/index.yaml')
+    async def test_get_experiments(self, sleep_mock):
+        res = await self.client.get_experiments()
+        self.assertEqual(res['data'][0]['object'], 'experiment')
+
+    @vcr.use_cassette('dataset_manifests/all_index.yaml')
+    async def test_iterate_all_dataset_manifests(self, sleep_mock):
+        items = []
+
+        async def handler(item):
+            items.append(item)
+
+        await self.client.iterate_all_dataset_manifests(handler, limit=1)
+        self.assertEqual(len(items), 3)
+
+    @vcr.use_cassette('dataset_manifests/all_index.yaml')
+    async def test_stream_dataset_manifests(self, sleep_mock):
+        items = [item async for item in self.client.stream_dataset_manifests(limit=1)]
+        self.assertEqual([item['object'] for item in items], ['dataset_manifest'] * 3)
+
+    @vcr.use_cassette('experiments/update_valid.yaml')
+    async def test_update_experiment_valid(self, sleep_mock):
+        res = await self.client.update_experiment('a0138f7adf78d6', name='Real experiment')
+        self.assertEqual(res['data']['object'], 'experiment')
+
+    @vcr.use_cassette('projects/deploy_project.yaml')
+    async def test_deploy_project(self, sleep_mock):
+        res = await self.client.deploy_project(1, worker_type_id=1, workers_count=2)
+        self.assertEqual(res['meta']['status'], 200)
+
+    @vcr.use_cassette('experiments/delete_not_existing.yaml')
+    async def test_delete_not_existing(self, sleep_mock):
+        with self.assertRaises(AsyncHubApiClient.FatalApiError):
+            await self.client.delete_experiment('a0138f7adf78d6')
+
+    @vcr.use_cassette('general_errors/server_unavailable.yaml')
+    async def test_server_unavailable(self, sleep_mock):
+        client = AsyncHubApiClient(
+            hub_app_url='https://optimizers-service-prod.herokuapp.com',
+            token='some-token',
+            retries_count=2,
+        )
+
+        async with client:
+            with self.assertRaises(AsyncHubApiClient.RetryableApiError) as context:
+                await client.get_trials()
+
+        self.assertIn('status: 503', str(context.exception))
+        self.assertEqual(sleep_mock.call_count, 2)
+
+    async def test_missing_parent_id(self, sleep_mock):
+        with self.assertRaises(AsyncHubApiClient.MissingParamError):
+            await self.client.get_endpoint_predictions()
+
+    async def test_map_captures_errors(self, sleep_mock):
+        async def get_trial(id):
+            if id == 'missing':
+                raise AsyncHubApiClient.FatalApiError('status: 404')
+
+            return {'data': {'id': id}}
+
+        with patch.object(self.client, 'get_trial', side_effect=get_trial):
+            results = await self.client.map('get_trial', [{'id': 1}, {'id': 'missing'}, {'id': 3}], max_workers=2)
+
+        self.assertEqual(results[0].result['data']['id'], 1)
+        self.assertIsInstance(results[1].error, AsyncHubApiClient.FatalApiError)
+        self.assertEqual(results[2].result['data']['id'], 3)
+
+    async def test_get_paginated_response_parallel(self, sleep_mock):
+        collection = FakeCollection(size=42)
+
+        async def get(path, args, **options):
+            return collection.index(**args)
+
+        with patch.object(self.client, 'get', side_effect=get):
+            res = await self.client.get_trials(limit=10, parallel_workers=3)
+
+        self.assertEqual(res['data'], collection.items)
+        self.assertEqual(res['meta']['pagination']['total'], 42)
+        self.assertEqual(sorted(collection.requested_offsets), list(range(0, 42, 10)))
+
+    async def test_iterate_with_prefetch_and_parallel_workers(self, sleep_mock):
+        for options in [{'prefetch_pages': 2}, {'parallel_workers': 3}]:
+            collection = FakeCollection(size=42)
+
+            async def get_trials(**kwargs):
+                return collection.index(**kwargs)
+
+            items = []
+            with patch.object(self.client, 'get_trials', side_effect=get_trials):
+                await self.client.iterate_all_trials(items.append, limit=10, **options)
+
+            self.assertEqual(items, collection.items)
+            self.assertEqual(sorted(collection.requested_offsets), list(range(0, 42, 10)))
+
+    async def test_stream_with_adaptive_page_size(self, sleep_mock):
+        collection = FakeCollection(size=100)
+
+        async def get_trials(**kwargs):
+            return collection.index(**kwargs)
+
+        with patch.object(self.client, 'get_trials', side_effect=get_trials):
+            items = [item async for item in self.client.stream_trials(adaptive=AsyncHubApiClient.AdaptivePageSize(limit=10))]
+
+        self.assertEqual(items, collection.items)
+        self.assertEqual(collection.requested_offsets, [0, 10, 30, 70])
+
+    async def test_adaptive_page_is_not_retried_before_shrink(self, sleep_mock):
+        collection = FakeCollection(size=50)
+        limits = []
+
+        async def get_trials(retry_counter=None, **kwargs):
+            limits.append(kwargs['limit'])
+            if kwargs['limit'] >= 20:
+                self.assertEqual(retry_counter.retries_left, 0)
+                raise AsyncHubApiClient.RetryableApiError('status: 504')
+            return collection.index(**kwargs)
+
+        with patch.object(self.client, 'get_trials', side_effect=get_trials):
+            items = [item async for item in self.client.stream_trials(adaptive=AsyncHubApiClient.AdaptivePageSize(limit=10))]
+
+        self.assertEqual(items, collection.items)
+        self.assertEqual(limits, [10, 20, 10, 10, 10, 10])
+
+    async def test_adaptive_with_parallel_pages(self, sleep_mock):
+        with self.assertRaises(ValueError):
+            await self.client.iterate_all_trials(print, adaptive=True, parallel_workers=2)
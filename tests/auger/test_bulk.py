@@ -0,0 +1,261 @@
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+from mock import patch
+from requests.exceptions import ChunkedEncodingError
+
+from auger.hub_api_client import AsyncHubApiClient, HubApiClient, RetryBudget
+from tests.session_helper import client_with_session, fake_response
+
+
+@patch('time.sleep', return_value=None)
+class TestBulkPredictions(unittest.TestCase):
+    def setUp(self):
+        self.client = HubApiClient(hub_app_url='http://localhost:5000', pool_maxsize=4)
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def create_prediction(self, failures={}):
+        failures = dict(failures)
+
+        def create(**params):
+            first = params['records'][0][0]
+            with self.lock:
+                self.calls.append(params)
+                if failures.get(first):
+                    failures[first] -= 1
+                    raise HubApiClient.RetryableApiError('status: 503')
+
+            # Later chunks complete first, time.sleep is mocked
+            threading.Event().wait(0.001 * (20 - first) / 10)
+            return {'data': {'object': 'prediction', 'records_count': len(params['records']), 'first': first}}
+
+        return patch.object(self.client, 'create_prediction', side_effect=create)
+
+    def test_chunk_rows(self, sleep_mock):
+        rows = [[id, 'x' * 10] for id in range(10)]
+
+        self.assertEqual([len(chunk) for chunk in self.client.chunk_rows(rows, chunk_rows=4)], [4, 4, 2])
+        # Each encoded row is 17 bytes
+        self.assertEqual([len(chunk) for chunk in self.client.chunk_rows(rows, chunk_rows=4, chunk_bytes=40)], [2, 2, 2, 2, 2])
+
+    def test_uploads_chunks_in_order(self, sleep_mock):
+        rows = ([id, id * 2] for id in range(20))
+
+        with self.create_prediction():
+            results = self.client.bulk_create_predictions('46188658d308607a', rows, ['x1', 'x2'], chunk_rows=3)
+
+        self.assertEqual([result.unwrap()['data']['first'] for result in results], [0, 3, 6, 9, 12, 15, 18])
+        self.assertEqual(sum(result.result['data']['records_count'] for result in results), 20)
+        self.assertEqual({call['pipeline_id'] for call in self.calls}, {'46188658d308607a'})
+        self.assertEqual(self.calls[0]['features'], ['x1', 'x2'])
+
+    def test_retries_only_failed_chunks(self, sleep_mock):
+        with self.create_prediction(failures={3: 1, 6: 5}):
+            results = self.client.bulk_create_predictions('1', [[id] for id in range(9)], ['x'], chunk_rows=3, chunk_retries=2)
+
+        self.assertEqual([result.ok for result in results], [True, True, False])
+        self.assertIsInstance(results[2].error, HubApiClient.RetryableApiError)
+        self.assertEqual(sorted(call['records'][0][0] for call in self.calls), [0, 3, 3, 6, 6, 6])
+
+    def test_transport_error_fails_only_its_chunk(self, sleep_mock):
+        client, session = client_with_session(fake_response(200, {'data': {'object': 'prediction'}}))
+        session.post.side_effect = [
+            fake_response(200, {'data': {}}), ChunkedEncodingError('Connection broken'), *[fake_response(200, {'data': {}})] * 3
+        ]
+
+        results = client.bulk_create_predictions('1', [[id] for id in range(5)], ['x'], chunk_rows=1, max_in_flight=1)
+
+        self.assertEqual([result.ok for result in results], [True, False, True, True, True])
+        self.assertIsInstance(results[1].error, ChunkedEncodingError)
+        self.assertEqual(session.post.call_count, 5)
+
+    def test_chunk_retries_use_retry_budget(self, sleep_mock):
+        client = HubApiClient(hub_app_url='http://localhost:5000', retry_budget=RetryBudget(max_tokens=1))
+        error = HubApiClient.RetryableApiError('status: 503')
+
+        with patch.object(client, 'create_prediction', side_effect=error) as create:
+            results = client.bulk_create_predictions('1', [[1], [2], [3]], ['x'], chunk_rows=1, max_in_flight=1, chunk_retries=2)
+
+        self.assertEqual(create.call_count, 4)
+        self.assertEqual(sleep_mock.call_count, 1)
+        self.assertEqual(client.retry_budget.stats()['retries'], 1)
+        self.assertEqual([type(result.error) for result in results], [HubApiClient.RetryBudgetExhaustedError] * 3)
+
+    def test_fail_fast_errors_are_not_retried(self, sleep_mock):
+        errors = [HubApiClient.CircuitOpenError('Circuit breaker is open'), HubApiClient.RetryBudgetExhaustedError('Retry budget is exhausted')]
+
+        with patch.object(self.client, 'create_prediction', side_effect=errors) as create:
+            results = self.client.bulk_create_predictions('1', [[1], [2]], ['x'], chunk_rows=1, max_in_flight=1)
+
+        self.assertEqual(create.call_count, 2)
+        self.assertEqual([result.error for result in results], errors)
+        sleep_mock.assert_not_called()
+
+    def test_invalid_chunk_is_not_retried(self, sleep_mock):
+        with patch.object(self.client, 'create_endpoint_prediction', side_effect=HubApiClient.InvalidParamsError('records invalid')) as create:
+            results = self.client.bulk_create_endpoint_predictions('endpoint', [[1], [2]], ['x'], chunk_rows=1)
+
+        self.assertEqual(create.call_count, 2)
+        self.assertFalse(any(result.ok for result in results))
+        self.assertEqual(create.call_args[1]['endpoint_id'], 'endpoint')
+
+    def test_bounded_in_flight_chunks(self, sleep_mock):
+        read = []
+        done = []
+
+        def rows():
+            for id in range(100):
+                read.append(id)
+                # Read rows are at most max_in_flight chunks ahead of uploaded ones
+                assert len(read) - len(done) * 5 <= 2 * 5 + 1
+                yield [id]
+
+        def on_chunk(index, rows_count, result):
+            done.append(index)
+
+        with self.create_prediction():
+            results = self.client.upload_chunks(
+                'create_prediction', self.client.chunk_rows(rows(), chunk_rows=5), 'records', max_in_flight=2, on_chunk=on_chunk,
+                pipeline_id='1', features=['x']
+            )
+
+        self.assertEqual(len(results), 20)
+        self.assertEqual(sorted(done), list(range(20)))
+
+
+@patch('time.sleep', return_value=None)
+class TestIngestActuals(unittest.TestCase):
+    def setUp(self):
+        self.bodies = []
+        self.client, self.session = client_with_session(token='token')
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def respond(self, failing_prediction_ids=()):
+        def post(url, data, headers):
+            body = b''.join(data) if not isinstance(data, bytes) else data
+            if headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            payload = json.loads(body)
+            self.bodies.append((url, payload, headers))
+
+            failed = any(actual['prediction_id'] in failing_prediction_ids for actual in payload['actuals'])
+            return fake_response(503 if failed else 200, {'data': {}, 'meta': {'status': 200}}, text='')
+
+        self.session.post.side_effect = post
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def test_csv_file(self, sleep_mock):
+        path = self.write('actuals.csv', 'prediction_id,actual\n' + ''.join('{},{}\n'.format(id, id % 2) for id in range(25)))
+        self.respond()
+
+        report = self.client.ingest_actuals(path, pipeline_id='46188658d308607a', batch_rows=10)
+
+        self.assertTrue(report.ok)
+        self.assertEqual((report.rows, report.batches), (25, 3))
+        self.assertGreater(report.rows_per_second, 0)
+        self.assertEqual(sorted(len(payload['actuals']) for _, payload, _ in self.bodies), [5, 10, 10])
+        url, payload, _ = self.bodies[0]
+        self.assertEqual(url, 'http://localhost:5000/api/v1/actuals')
+        self.assertEqual(payload['pipeline_id'], '46188658d308607a')
+        self.assertEqual(payload['token'], 'token')
+        self.assertIn({'prediction_id': '1', 'actual': '1'}, sum([payload['actuals'] for _, payload, _ in self.bodies], []))
+
+    def test_ndjson_file_gzipped_to_endpoint(self, sleep_mock):
+        path = self.write('actuals.ndjson', ''.join(json.dumps({'prediction_id': str(id), 'actual': id}) + '\n' for id in range(4)) + '\n')
+        self.respond()
+
+        report = self.client.ingest_actuals(path, endpoint_id='ddc968ac', compress=True, batch_rows=10)
+
+        self.assertEqual(report.rows, 4)
+        url, payload, headers = self.bodies[0]
+        self.assertEqual(url, 'http://localhost:5000/api/v1/endpoints/ddc968ac/actuals')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(payload['actuals'][3], {'prediction_id': '3', 'actual': 3})
+
+    def test_reports_failed_batches(self, sleep_mock):
+        self.respond(failing_prediction_ids=['4'])
+        batches = []
+
+        report = self.client.ingest_actuals(
+            ({'prediction_id': str(id), 'actual': 1} for id in range(10)), pipeline_id='1', batch_rows=3, chunk_retries=1,
+            on_batch=lambda report, index, rows_count, result: batches.append((index, rows_count, result.ok))
+        )
+
+        self.assertFalse(report.ok)
+        self.assertEqual([(index, rows_count) for index, rows_count, _ in report.failed_batches], [(1, 3)])
+        self.assertIsInstance(report.failed_batches[0][2], HubApiClient.RetryableApiError)
+        self.assertEqual(report.failed_rows, 3)
+        self.assertEqual(sorted(batches), [(0, 3, True), (1, 3, False), (2, 3, True), (3, 1, True)])
+        self.assertEqual(len(self.bodies), 5)
+
+    def test_reports_transport_errors_of_batches(self, sleep_mock):
+        self.respond()
+        post = self.session.post.side_effect
+
+        def broken_post(url, data, headers):
+            if b'"prediction_id": "4"' in data or b'"prediction_id":"4"' in data:
+                raise ChunkedEncodingError('Connection broken')
+            return post(url, data, headers)
+
+        self.session.post.side_effect = broken_post
+
+        report = self.client.ingest_actuals(
+            ({'prediction_id': str(id), 'actual': 1} for id in range(10)), pipeline_id='1', batch_rows=3, max_in_flight=1
+        )
+
+        self.assertFalse(report.ok)
+        self.assertEqual([(index, rows_count) for index, rows_count, _ in report.failed_batches], [(1, 3)])
+        self.assertIsInstance(report.failed_batches[0][2], ChunkedEncodingError)
+        self.assertEqual(report.rows, 10)
+
+    def test_requires_pipeline_or_endpoint(self, sleep_mock):
+        with self.assertRaises(HubApiClient.MissingParamError):
+            self.client.ingest_actuals([])
+
+
+class TestAsyncBulkPredictions(unittest.IsolatedAsyncioTestCase):
+    async def test_uploads_chunks_in_order(self):
+        client = AsyncHubApiClient(hub_app_url='http://localhost:5000', retry_wait_seconds=0)
+        failures = {2: 1}
+
+        async def create(**params):
+            first = params['records'][0][0]
+            if failures.get(first):
+                failures[first] -= 1
+                raise HubApiClient.NetworkError('Connection reset')
+            await asyncio.sleep(0.001 * (10 - first))
+            return {'data': {'first': first}}
+
+        with patch.object(client, 'create_prediction', side_effect=create):
+            results = await client.bulk_create_predictions('1', [[id] for id in range(10)], ['x'], chunk_rows=2, max_in_flight=3)
+
+        self.assertEqual([result.unwrap()['data']['first'] for result in results], [0, 2, 4, 6, 8])
+        await client.close()
+
+    async def test_unexpected_error_fails_only_its_chunk(self):
+        client = AsyncHubApiClient(hub_app_url='http://localhost:5000')
+
+        async def create(**params):
+            if params['records'][0][0] == 1:
+                raise asyncio.TimeoutError()
+            return {'data': {}}
+
+        with patch.object(client, 'create_prediction', side_effect=create):
+            results = await client.bulk_create_predictions('1', [[id] for id in range(3)], ['x'], chunk_rows=1)
+
+        self.assertEqual([result.ok for result in results], [True, False, True])
+        self.assertIsInstance(results[1].error, asyncio.TimeoutError)
+        await client.close()
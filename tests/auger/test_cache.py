@@ -0,0 +1,317 @@
+import os
+import tempfile
+import unittest
+from mock import patch
+
+from auger.hub_api_client import HubApiClient, ResponseCache, SQLiteResponseCache
+from tests.clock_helper import FakeClock
+from tests.session_helper import client_with_session, fake_response
+from tests.vcr_helper import vcr
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(max_size=2, clock=self.clock)
+
+    def test_key_normalizes_payload(self):
+        self.assertEqual(
+            self.cache.key('trial', 'http://hub', '/api/v1/trials', {'limit': 1, 'offset': 0}),
+            self.cache.key('trial', 'http://hub', '/api/v1/trials', {'offset': 0, 'limit': 1})
+        )
+
+    def test_ttl(self):
+        self.cache.set('key', {'data': 1}, ttl=10)
+        self.assertEqual(self.cache.get('key'), {'data': 1})
+
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'size': 0})
+
+    def test_lru_eviction(self):
+        self.cache.set('a', 1, ttl=10)
+        self.cache.set('b', 2, ttl=10)
+        self.cache.get('a')
+        self.cache.set('c', 3, ttl=10)
+
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('c'), 3)
+
+    def test_returns_copies(self):
+        self.cache.set('key', {'data': {'x': 1}}, ttl=10)
+        self.cache.get('key')['data']['x'] = 2
+
+        self.assertEqual(self.cache.get('key'), {'data': {'x': 1}})
+
+    def test_invalidate_resource(self):
+        project_key = self.cache.key('project', 'http://hub', '/api/v1/projects/1', {})
+        trial_key = self.cache.key('trial', 'http://hub', '/api/v1/trials/1', {})
+        self.cache.set(project_key, 1, ttl=10)
+        self.cache.set(trial_key, 2, ttl=10)
+
+        self.cache.invalidate('project')
+
+        self.assertIsNone(self.cache.get(project_key))
+        self.assertEqual(self.cache.get(trial_key), 2)
+
+
+class TestSQLiteResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'responses.db')
+        self.clock = FakeClock()
+        self.cache = SQLiteResponseCache(self.path, max_bytes=100, clock=self.clock)
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def key(self, id):
+        return self.cache.key('hyperparameter', 'http://hub', '/api/v1/hyperparameters/{}'.format(id), {})
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get(self.key(1)))
+
+        self.cache.set(self.key(1), {'data': {'id': 1}})
+        self.assertEqual(self.cache.get(self.key(1)), {'data': {'id': 1}})
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_reopens_connection_after_fork(self):
+        connection = self.cache.connection()
+
+        with patch('os.getpid', return_value=os.getpid() + 1):
+            child_connection = self.cache.connection()
+            self.assertIsNot(child_connection, connection)
+            self.assertIs(self.cache.connection(), child_connection)
+            self.cache.set(self.key(1), {'data': {'id': 1}})
+
+        self.assertIsNot(self.cache.connection(), child_connection)
+        self.assertEqual(self.cache.get(self.key(1)), {'data': {'id': 1}})
+        child_connection.close()
+
+    @unittest.skipIf(not hasattr(os, 'fork'), 'fork is not supported')
+    def test_forked_process(self):
+        self.cache.set(self.key(1), {'data': {'id': 1}})
+        pid = os.fork()
+
+        if pid == 0:
+            try:
+                self.cache.set(self.key(2), self.cache.get(self.key(1)))
+                self.cache.close()
+            finally:
+                os._exit(0)
+
+        os.waitpid(pid, 0)
+        self.assertEqual(self.cache.get(self.key(2)), {'data': {'id': 1}})
+
+    def test_ttl(self):
+        self.cache.set(self.key(1), {'data': {'id': 1}}, ttl=10)
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get(self.key(1)))
+
+    def test_size_bounded_eviction(self):
+        # Every response takes 41 bytes, so only 2 of them fit
+        for id in range(2):
+            self.clock.now = id
+            self.cache.set(self.key(id), {'data': {'id': id, 'name': 'x' * 10}})
+
+        self.clock.now = 2
+        self.cache.get(self.key(0))
+        self.clock.now = 3
+        self.cache.set(self.key(2), {'data': {'id': 2, 'name': 'x' * 10}})
+
+        self.assertLessEqual(self.cache.stats()['bytes'], 100)
+        self.assertIsNotNone(self.cache.get(self.key(0)))
+        self.assertIsNone(self.cache.get(self.key(1)))
+        self.assertIsNotNone(self.cache.get(self.key(2)))
+
+    def test_shared_database_file(self):
+        other_cache = SQLiteResponseCache(self.path)
+        self.cache.set(self.key(1), {'data': {'id': 1}})
+
+        self.assertEqual(other_cache.get(self.key(1)), {'data': {'id': 1}})
+        other_cache.close()
+
+    def test_invalidate_resource(self):
+        self.cache.set(self.key(1), {'data': {'id': 1}})
+        self.cache.invalidate('hyperparameter')
+        self.assertIsNone(self.cache.get(self.key(1)))
+
+
+@patch('time.sleep', return_value=None)
+class TestHubApiClientPersistentCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'responses.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def build_client(self, token='0d5a55cb795f2039922689e647cb3c5d24a0992bf58d941dad864ef7c371f8fc'):
+        return HubApiClient(hub_app_url='http://localhost:5000', hub_project_api_token=token, persistent_cache=self.path)
+
+    # Second client (e.g. next worker process) gets response from the database file
+    @vcr.use_cassette('hyperparameters/show.yaml')
+    def test_immutable_show(self, sleep_mock):
+        first = self.build_client().get_hyperparameter(1)
+        second_client = self.build_client()
+        second = second_client.get_hyperparameter(1)
+
+        self.assertEqual(first, second)
+        self.assertEqual(second_client.persistent_cache.stats()['hits'], 1)
+
+    def test_completed_trial(self, sleep_mock):
+        client = self.build_client()
+        completed = {'data': {'id': 1, 'status': 'completed'}}
+        running = {'data': {'id': 2, 'status': 'running'}}
+
+        with patch.object(client, 'request_with_retries', side_effect=[completed, running, running]) as request:
+            client.get_trial(1)
+            client.get_trial(1)
+            client.get_trial(2)
+            client.get_trial(2)
+
+        self.assertEqual(request.call_count, 3)
+
+    def test_writes_keep_immutable_responses(self, sleep_mock):
+        client = self.build_client()
+        completed = {'data': {'id': 1, 'status': 'completed'}}
+
+        with patch.object(client, 'request_with_retries', side_effect=[completed, {'data': {}}]) as request:
+            client.get_trial(1)
+            client.update_trial(2, status='running')
+            client.get_trial(1)
+
+        self.assertEqual(request.call_count, 2)
+
+    def test_responses_are_stored_per_token(self, sleep_mock):
+        completed = {'data': {'id': 1, 'status': 'completed'}}
+        first_client = self.build_client('token-a')
+        second_client = self.build_client('token-b')
+
+        with patch.object(first_client, 'request_with_retries', return_value=completed):
+            first_client.get_trial(1)
+
+        with patch.object(second_client, 'request_with_retries', return_value=completed) as request:
+            second_client.get_trial(1)
+
+        self.assertEqual(request.call_count, 1)
+
+    def test_mutable_resource(self, sleep_mock):
+        client = self.build_client()
+
+        with patch.object(client, 'request_with_retries', return_value={'data': {}}) as request:
+            client.get_hyperparameters()
+            client.get_hyperparameters()
+
+        self.assertEqual(request.call_count, 2)
+
+
+@patch('time.sleep', return_value=None)
+class TestHubApiClientCache(unittest.TestCase):
+    def setUp(self):
+        self.client = HubApiClient(
+            hub_app_url='http://localhost:5000',
+            hub_project_api_token='0d5a55cb795f2039922689e647cb3c5d24a0992bf58d941dad864ef7c371f8fc',
+            cache=True
+        )
+
+    # Cassette has only one request, so the second call has to be served from cache
+    @vcr.use_cassette('projects/show.yaml')
+    def test_cached_show(self, sleep_mock):
+        first = self.client.get_project(31)
+        second = self.client.get_project(31)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.client.cache.stats()['hits'], 1)
+
+    @vcr.use_cassette('instance_types/index.yaml')
+    def test_cached_index(self, sleep_mock):
+        self.client.get_instance_types()
+        self.client.get_instance_types()
+
+        self.assertEqual(self.client.cache.stats()['hits'], 1)
+
+    def test_not_cached_resource(self, sleep_mock):
+        with patch.object(self.client, 'request_with_retries', return_value={'data': {}}) as request:
+            self.client.get_trial(1)
+            self.client.get_trial(1)
+
+        self.assertEqual(request.call_count, 2)
+
+    def test_cache_ttls_override(self, sleep_mock):
+        client = HubApiClient(hub_app_url='http://localhost:5000', cache=True, cache_ttls={'trial': 5, 'project': 0})
+
+        with patch.object(client, 'request_with_retries', return_value={'data': {}}) as request:
+            client.get_trial(1)
+            client.get_trial(1)
+            client.get_project(31)
+            client.get_project(31)
+
+        self.assertEqual(request.call_count, 3)
+
+    def test_update_invalidates_resource(self, sleep_mock):
+        with patch.object(self.client, 'request_with_retries', return_value={'data': {}}) as request:
+            self.client.get_project(31)
+            self.client.update_project(1, name='new name')
+            self.client.get_project(31)
+
+        self.assertEqual(request.call_count, 3)
+
+
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        self.client, self.session = client_with_session(conditional_requests=True)
+
+    def test_revalidate_with_etag(self):
+        body = {'data': {'object': 'cluster_task', 'id': 25, 'status': 'running'}, 'meta': {'status': 200}}
+        self.session.get.side_effect = [
+            fake_response(200, body, {'ETag': 'W/"abc"', 'Last-Modified': 'Wed, 21 Oct 2020 07:28:00 GMT'}),
+            fake_response(304),
+        ]
+
+        self.assertEqual(self.client.get_cluster_task(25), body)
+        self.assertEqual(self.client.get_cluster_task(25), body)
+
+        first_headers = self.session.get.call_args_list[0][1]['headers']
+        second_headers = self.session.get.call_args_list[1][1]['headers']
+        self.assertNotIn('If-None-Match', first_headers)
+        self.assertEqual(second_headers['If-None-Match'], 'W/"abc"')
+        self.assertEqual(second_headers['If-Modified-Since'], 'Wed, 21 Oct 2020 07:28:00 GMT')
+
+    def test_modified_response_replaces_validators(self):
+        running = {'data': {'status': 'running'}}
+        done = {'data': {'status': 'done'}}
+        self.session.get.side_effect = [
+            fake_response(200, running, {'ETag': '"1"'}),
+            fake_response(200, done, {'ETag': '"2"'}),
+            fake_response(304),
+        ]
+
+        self.assertEqual(self.client.get_warm_start_request(1), running)
+        self.assertEqual(self.client.get_warm_start_request(1), done)
+        self.assertEqual(self.client.get_warm_start_request(1), done)
+        self.assertEqual(self.session.get.call_args_list[2][1]['headers']['If-None-Match'], '"2"')
+
+    def test_not_revalidated_resource(self):
+        self.session.get.side_effect = [
+            fake_response(200, {'data': {}}, {'ETag': '"1"'}),
+            fake_response(200, {'data': {}}, {'ETag': '"1"'}),
+        ]
+
+        self.client.get_trial(1)
+        self.client.get_trial(1)
+
+        self.assertNotIn('If-None-Match', self.session.get.call_args_list[1][1]['headers'])
+
+    @patch('time.sleep', return_value=None)
+    def test_unexpected_not_modified(self, sleep_mock):
+        client, session = client_with_session(fake_response(304), retries_count=1)
+
+        with self.assertRaises(HubApiClient.RetryableApiError) as context:
+            client.get_trial(1)
+
+        self.assertEqual(context.exception.status_code, 304)
+        self.assertEqual(session.get.call_count, 2)
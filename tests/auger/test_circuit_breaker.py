@@ -0,0 +1,129 @@
+import unittest
+from mock import patch
+from requests.exceptions import ChunkedEncodingError, ConnectionError
+
+from auger.hub_api_client import CircuitBreaker, HubApiClient
+from tests.clock_helper import FakeClock
+from tests.session_helper import client_with_session, fake_response
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.changes = []
+        self.breaker = CircuitBreaker(
+            failure_threshold=2, recovery_timeout=10, name='http://hub', clock=self.clock,
+            on_state_change=lambda *change: self.changes.append(change)
+        )
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.changes, [('http://hub', 'closed', 'open')])
+
+    def test_half_open_trial_closes_circuit(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual([change[2] for change in self.changes], ['open', 'half_open', 'closed'])
+
+    def test_half_open_failure_opens_circuit(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        self.clock.now = 10
+        self.breaker.allow()
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.clock.now = 19
+        self.assertFalse(self.breaker.allow())
+
+    def test_release_gives_back_half_open_slot(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+
+
+@patch('time.sleep', return_value=None)
+class TestHubApiClientCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.changes = []
+        self.client, self.session = client_with_session(
+            optimizers_url='http://localhost:7777',
+            retries_count=5,
+            circuit_breaker={'failure_threshold': 3, 'recovery_timeout': 60},
+            on_circuit_state_change=lambda *change: self.changes.append(change)
+        )
+
+    def response(self, status_code):
+        return fake_response(status_code, {'data': {}, 'meta': {'status': status_code, 'errors': []}})
+
+    def test_fails_fast_while_open(self, sleep_mock):
+        self.session.post.side_effect = ConnectionError('refused')
+
+        with self.assertRaises(HubApiClient.CircuitOpenError) as context:
+            self.client.get_next_trials({'trials_limit': 1})
+
+        self.assertEqual(self.session.post.call_count, 3)
+        self.assertIn('Circuit breaker of http://localhost:7777 is open on: POST /next_trials', str(context.exception))
+        self.assertEqual(self.changes, [('http://localhost:7777', 'closed', 'open')])
+
+        with self.assertRaises(HubApiClient.NetworkError):
+            self.client.get_fte({})
+        self.assertEqual(self.session.post.call_count, 3)
+
+    def test_breakers_are_per_base_url(self, sleep_mock):
+        self.session.post.side_effect = ConnectionError('refused')
+        with self.assertRaises(HubApiClient.CircuitOpenError):
+            self.client.get_next_trials({})
+
+        self.session.get.return_value = self.response(200)
+        self.assertEqual(self.client.get_trial(1), {'data': {}, 'meta': {'status': 200, 'errors': []}})
+
+    def test_error_responses_keep_circuit_closed(self, sleep_mock):
+        self.session.get.side_effect = [self.response(503), self.response(503), self.response(404), self.response(503), self.response(503), self.response(200)]
+
+        with self.assertRaises(HubApiClient.FatalApiError):
+            self.client.get_trial(1)
+        self.client.get_trial(1)
+
+        self.assertEqual(self.changes, [])
+
+    def test_unexpected_error_of_half_open_trial(self, sleep_mock):
+        clock = FakeClock()
+        client, session = client_with_session(
+            retries_count=0, circuit_breaker={'failure_threshold': 1, 'recovery_timeout': 60, 'clock': clock}
+        )
+        session.get.side_effect = [ConnectionError('refused'), ChunkedEncodingError('broken'), self.response(200)]
+
+        with self.assertRaises(HubApiClient.NetworkError):
+            client.get_trial(1)
+
+        clock.now = 60
+        with self.assertRaises(ChunkedEncodingError):
+            client.get_trial(1)
+        self.assertEqual(client.circuit_breaker('http://localhost:5000').state, CircuitBreaker.OPEN)
+
+        clock.now = 120
+        client.get_trial(1)
+        self.assertEqual(client.circuit_breaker('http://localhost:5000').state, CircuitBreaker.CLOSED)
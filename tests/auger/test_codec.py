@@ -0,0 +1,227 @@
+import datetime
+import decimal
+import gzip
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from auger.hub_api_client import AsyncHubApiClient, HubApiClient
+from auger.hub_api_client.codec import JsonCodec, OrjsonCodec, build_codec, iter_json, orjson
+from tests.session_helper import client_with_session, fake_response
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# numpy-like array without numpy dependency
+class FakeArray:
+    dtype = 'float64'
+
+    def __init__(self, values):
+        self.values = values
+
+    def tolist(self):
+        return self.values
+
+
+class CodecTests:
+    def test_dumps_bytes(self):
+        self.assertEqual(json.loads(self.codec.dumps({'a': [1, 'b', None]})), {'a': [1, 'b', None]})
+        self.assertIsInstance(self.codec.dumps({}), bytes)
+
+    def test_extra_types(self):
+        value = {
+            'at': datetime.datetime(2020, 10, 21, 7, 28),
+            'on': datetime.date(2020, 10, 21),
+            'score': decimal.Decimal('0.5'),
+            'records': FakeArray([[1.1, 1.2]]),
+        }
+
+        self.assertEqual(json.loads(self.codec.dumps(value)), {
+            'at': '2020-10-21T07:28:00', 'on': '2020-10-21', 'score': 0.5, 'records': [[1.1, 1.2]]
+        })
+
+    def test_unsupported_type(self):
+        with self.assertRaises(TypeError):
+            self.codec.dumps({'a': object()})
+
+    def test_nan_is_null(self):
+        value = {'records': [[1.1, float('nan')], (float('inf'), decimal.Decimal('NaN'))], 'array': FakeArray([float('-inf'), 2.0])}
+        self.assertEqual(json.loads(self.codec.dumps(value)), {'records': [[1.1, None], [None, None]], 'array': [None, 2.0]})
+
+    def test_loads(self):
+        self.assertEqual(self.codec.loads(b'{"data": {"id": 1}}'), {'data': {'id': 1}})
+
+        with self.assertRaises(ValueError):
+            self.codec.loads(b'<html></html>')
+
+
+class TestJsonCodec(CodecTests, unittest.TestCase):
+    codec = JsonCodec()
+
+
+@unittest.skipIf(orjson is None, 'orjson is not installed')
+class TestOrjsonCodec(CodecTests, unittest.TestCase):
+    def setUp(self):
+        self.codec = OrjsonCodec()
+
+
+class TestHubApiClientCodec(unittest.TestCase):
+    def test_build_codec(self):
+        self.assertEqual(build_codec('json').name, 'json')
+        self.assertEqual(build_codec('auto').name, 'orjson' if orjson else 'json')
+
+        codec = JsonCodec()
+        self.assertIs(HubApiClient(hub_app_url='http://localhost:5000', json_codec=codec).codec, codec)
+
+    def test_request_body_is_encoded_with_codec(self):
+        client, session = client_with_session(fake_response(201, {'data': {'id': 1}}), token='token', json_codec='json')
+
+        self.assertEqual(client.create_trial(score=decimal.Decimal('0.5')), {'data': {'id': 1}})
+        self.assertEqual(json.loads(session.post.call_args[1]['data']), {'score': 0.5, 'token': 'token'})
+
+        data = client.compress(client.codec.dumps({'a': 1}))
+        self.assertEqual(json.loads(gzip.decompress(data)), {'a': 1})
+
+    def test_nan_records_are_sent_as_null(self):
+        for codec in ['json', 'orjson'] if orjson else ['json']:
+            client, session = client_with_session(fake_response(201, {'data': {'id': 1}}), json_codec=codec)
+
+            client.create_prediction(pipeline_id='46188658d308607a', records=[[2.1, float('NaN')]], features=['x1', 'x2'])
+
+            body = session.post.call_args[1]['data']
+            self.assertNotIn(b'NaN', body)
+            self.assertEqual(json.loads(body)['records'], [[2.1, None]])
+
+
+class TestIterJson(unittest.TestCase):
+    def test_chunks_are_valid_json(self):
+        value = {'trials': [{'id': id, 'score': id / 10} for id in range(25)], 'space': {'x': [1, 2]}, 1: None, 'empty': []}
+
+        for codec in [JsonCodec()] + ([OrjsonCodec()] if orjson else []):
+            chunks = list(iter_json(value, codec.dumps, batch_size=10))
+            self.assertGreater(len(chunks), 5)
+            self.assertEqual(json.loads(b''.join(chunks)), json.loads(json.dumps(value)))
+
+
+class TestCompression(unittest.TestCase):
+    def createClient(self, **config):
+        client, self.session = client_with_session(fake_response(200, {'data': []}), optimizers_url='http://localhost:7777', **config)
+        return client
+
+    def sent_body(self):
+        kwargs = self.session.post.call_args[1]
+        data = kwargs['data']
+        return (data if isinstance(data, bytes) else b''.join(data)), kwargs['headers']
+
+    def test_gzip_body_with_content_length(self):
+        client = self.createClient()
+        payload = {'trials': [{'id': id} for id in range(5000)]}
+
+        client.get_next_trials(payload)
+
+        data, headers = self.sent_body()
+        self.assertIsInstance(self.session.post.call_args[1]['data'], bytes)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Content-Length'], str(len(data)))
+        self.assertEqual(json.loads(gzip.decompress(data))['trials'], payload['trials'])
+
+    def test_streams_gzip_body(self):
+        client = self.createClient(compression_level=1, compression_stream_threshold=1024)
+        payload = {'trials': [{'id': id} for id in range(5000)]}
+
+        client.get_next_trials(payload)
+
+        self.assertNotIsInstance(self.session.post.call_args[1]['data'], bytes)
+        data, headers = self.sent_body()
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(data))['trials'], payload['trials'])
+
+    def test_small_payload_is_not_compressed(self):
+        client = self.createClient(compression_threshold=1024)
+
+        client.get_next_trials({'trials': []})
+
+        data, headers = self.sent_body()
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(json.loads(data), {'trials': []})
+
+    @unittest.skipIf(zstandard is None, 'zstandard is not installed')
+    def test_zstd(self):
+        client = self.createClient(compression='zstd')
+
+        client.get_next_trials({'trials': [1, 2]})
+
+        data, headers = self.sent_body()
+        self.assertEqual(headers['Content-Encoding'], 'zstd')
+        self.assertEqual(json.loads(zstandard.ZstdDecompressor().decompressobj().decompress(data)), {'trials': [1, 2]})
+
+    def test_unsupported_compression(self):
+        with self.assertRaises(ValueError) as context:
+            self.createClient(compression='br')
+
+        self.assertIn('Unsupported compression `br`, use one of: gzip, zstd', str(context.exception))
+
+
+# Local stand-in for optimizers service, reads body by Content-Length like wsgiref, so chunked bodies are read as empty
+class OptimizersHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+
+        self.server.requests.append(body)
+        if body:
+            status, data = 200, {'data': json.loads(body), 'meta': {'status': 200}}
+        else:
+            errors = [{'error_param': 'trials', 'message': 'is missing'}]
+            status, data = 400, {'data': None, 'meta': {'status': 400, 'errors': errors}}
+        data = json.dumps(data).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class LocalOptimizersService:
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), OptimizersHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.config = dict(
+            hub_app_url='http://127.0.0.1:5000',
+            optimizers_url='http://127.0.0.1:{}'.format(self.server.server_address[1]),
+            retries_count=0
+        )
+        self.payload = {'trials': [{'id': id} for id in range(100)]}
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestCompressionLocalServer(LocalOptimizersService, unittest.TestCase):
+    def test_get_next_trials(self):
+        client = HubApiClient(**self.config)
+
+        self.assertEqual(client.get_next_trials(self.payload)['data'], self.payload)
+        self.assertEqual(len(self.server.requests), 1)
+        client.close()
+
+
+class TestAsyncCompressionLocalServer(LocalOptimizersService, unittest.IsolatedAsyncioTestCase):
+    async def test_get_next_trials(self):
+        client = AsyncHubApiClient(**self.config)
+
+        self.assertEqual((await client.get_next_trials(self.payload))['data'], self.payload)
+        self.assertEqual(len(self.server.requests), 1)
+        await client.close()
@@ -0,0 +1,155 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from auger.hub_api_client import AsyncHubApiClient, HubApiClient
+
+
+# Local stand-in for Hub API trials index
+class TrialsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(params)
+
+        items = self.server.items
+        limit = params['limit']
+        pagination = {'limit': limit}
+
+        if self.server.mode == 'server_cursor':
+            start = int(params.get('cursor') or 0)
+            data = items[start:start + limit]
+            next_start = start + len(data)
+            pagination['next_cursor'] = str(next_start) if next_start < len(items) else None
+        elif self.server.mode == 'after_id' and 'after_id' in params:
+            data = [item for item in items if item['id'] > params['after_id']][:limit]
+        else:
+            offset = params.get('offset', 0)
+            data = items[offset:offset + limit]
+            pagination['offset'] = offset
+
+        pagination['count'] = len(data)
+        body = json.dumps({'data': data, 'meta': {'status': 200, 'pagination': pagination}}).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCursorPagination(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), TrialsHandler)
+        self.server.items = [{'id': id, 'object': 'trial'} for id in range(1, 24)]
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.client = HubApiClient(
+            hub_app_url='http://127.0.0.1:{}'.format(self.server.server_address[1]),
+            token='some-token'
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stream(self, mode, **kwargs):
+        self.server.mode = mode
+        return list(self.client.stream_trials(limit=5, pagination='cursor', **kwargs))
+
+    def test_server_cursor(self):
+        self.assertEqual(self.stream('server_cursor'), self.server.items)
+        self.assertEqual([params.get('cursor') for params in self.server.requests], [None, '5', '10', '15', '20'])
+
+    def test_after_id(self):
+        self.assertEqual(self.stream('after_id'), self.server.items)
+        self.assertEqual([params.get('after_id') for params in self.server.requests], [None, 5, 10, 15, 20])
+
+    def test_fallback_to_offsets(self):
+        self.assertEqual(self.stream('offsets'), self.server.items)
+        self.assertEqual([params['offset'] for params in self.server.requests[2:]], [5, 10, 15, 20])
+
+    def test_iterate_with_cursor(self):
+        self.server.mode = 'after_id'
+        items = []
+        self.client.iterate_all_trials(items.append, limit=5, pagination='cursor')
+
+        self.assertEqual(items, self.server.items)
+
+    def test_cursor_with_parallel_pages(self):
+        for options in [{'prefetch_pages': 2}, {'parallel_workers': 2}]:
+            with self.assertRaises(ValueError):
+                self.client.iterate_all_trials(print, limit=5, pagination='cursor', **options)
+
+        self.assertEqual(self.server.requests, [])
+
+    def test_parallel_pages_of_resource_without_cursor_support(self):
+        self.server.mode = 'offsets'
+
+        for options in [{'prefetch_pages': 2}, {'parallel_workers': 2}]:
+            self.server.requests = []
+            items = []
+            self.client.iterate_all_experiments(items.append, limit=5, pagination='cursor', **options)
+
+            self.assertEqual(items, self.server.items)
+            self.assertTrue(all('pagination' not in params for params in self.server.requests))
+
+    def test_resource_without_cursor_support(self):
+        self.server.mode = 'after_id'
+        items = list(self.client.stream_experiments(limit=5, pagination='cursor'))
+
+        self.assertEqual(items, self.server.items)
+        self.assertNotIn('after_id', self.server.requests[-1])
+
+
+class TestAsyncCursorPagination(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), TrialsHandler)
+        self.server.items = [{'id': id, 'object': 'trial'} for id in range(1, 24)]
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.client = AsyncHubApiClient(
+            hub_app_url='http://127.0.0.1:{}'.format(self.server.server_address[1]),
+            token='some-token'
+        )
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    async def test_after_id(self):
+        self.server.mode = 'after_id'
+        items = [item async for item in self.client.stream_trials(limit=5, pagination='cursor')]
+
+        self.assertEqual(items, self.server.items)
+        self.assertEqual([params.get('after_id') for params in self.server.requests], [None, 5, 10, 15, 20])
+        self.assertNotIn('pagination', self.server.requests[0])
+
+    async def test_server_cursor(self):
+        self.server.mode = 'server_cursor'
+        items = []
+        await self.client.iterate_all_trials(items.append, limit=5, pagination='cursor')
+
+        self.assertEqual(items, self.server.items)
+        self.assertEqual([params.get('cursor') for params in self.server.requests], [None, '5', '10', '15', '20'])
+
+    async def test_parallel_pages_of_resource_without_cursor_support(self):
+        self.server.mode = 'offsets'
+
+        for options in [{'prefetch_pages': 2}, {'parallel_workers': 2}]:
+            self.server.requests = []
+            items = []
+            await self.client.iterate_all_experiments(items.append, limit=5, pagination='cursor', **options)
+
+            self.assertEqual(sorted(items, key=lambda item: item['id']), self.server.items)
+            self.assertTrue(all('pagination' not in params for params in self.server.requests))
+
+        with self.assertRaises(ValueError):
+            await self.client.iterate_all_trials(print, limit=5, pagination='cursor', parallel_workers=2)
@@ -0,0 +1,148 @@
+import threading
+import unittest
+from mock import MagicMock, patch
+
+from auger.hub_api_client import AsyncHubApiClient, ExponentialBackoff, HubApiClient
+from auger.hub_api_client.polling import Poller
+
+
+def statuses_response(*statuses):
+    return [{'data': {'id': 1, 'status': status}} for status in statuses]
+
+
+class TestExponentialBackoff(unittest.TestCase):
+    def test_grows_up_to_max_wait(self):
+        backoff = ExponentialBackoff(initial=1, factor=2, max_wait=5, jitter=0)
+
+        self.assertEqual([backoff.wait(attempt) for attempt in range(5)], [1, 2, 4, 5, 5])
+        self.assertEqual(backoff.wait(10000), 5)
+
+    def test_jitter(self):
+        backoff = ExponentialBackoff(initial=4, jitter=0.5, random=lambda: 1.0)
+
+        self.assertEqual(backoff.wait(0), 2)
+
+
+class TestPoller(unittest.TestCase):
+    def setUp(self):
+        self.poller = Poller(max_workers=4)
+        self.backoff = ExponentialBackoff(initial=0.001, max_wait=0.01)
+
+    def tearDown(self):
+        self.poller.close()
+
+    def test_multiplexes_jobs_on_one_scheduler(self):
+        counts = {}
+        lock = threading.Lock()
+
+        def poll(id):
+            def call():
+                with lock:
+                    counts[id] = counts.get(id, 0) + 1
+                    return counts[id]
+            return call
+
+        futures = [self.poller.submit(poll(id), lambda count: count >= 3, self.backoff) for id in range(100)]
+
+        self.assertEqual([future.result(5) for future in futures], [3] * 100)
+        self.assertEqual(len([thread for thread in threading.enumerate() if thread.name == 'hub-api-poller']), 1)
+
+    def test_deadline(self):
+        future = self.poller.submit(lambda: 'running', lambda res: False, self.backoff, deadline=self.poller.clock() + 0.05)
+
+        with self.assertRaises(TimeoutError):
+            future.result(5)
+
+    def test_poll_error(self):
+        error = HubApiClient.FatalApiError('Not found')
+        poll = MagicMock(side_effect=error)
+
+        future = self.poller.submit(poll, lambda res: True, self.backoff)
+
+        self.assertIs(future.exception(5), error)
+
+    def test_close_cancels_pending_jobs(self):
+        future = self.poller.submit(lambda: 'running', lambda res: False, ExponentialBackoff(initial=60))
+        while len(self.poller.queue) == 0 or self.poller.queue[0][0] <= self.poller.clock():
+            pass
+
+        self.poller.close()
+
+        self.assertTrue(future.cancelled())
+
+
+class TestWaitFor(unittest.TestCase):
+    def setUp(self):
+        self.client = HubApiClient(
+            hub_app_url='http://localhost:5000',
+            poll_backoff=ExponentialBackoff(initial=0.001, max_wait=0.01)
+        )
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_waits_for_done_status(self):
+        with patch.object(self.client, 'get_warm_start_request', side_effect=statuses_response('requested', 'requested', 'done')) as get:
+            res = self.client.wait_for('warm_start_request', 1)
+
+        self.assertEqual(res['data']['status'], 'done')
+        self.assertEqual(get.call_count, 3)
+        get.assert_called_with(1)
+
+    def test_until_statuses_and_callable(self):
+        with patch.object(self.client, 'get_cluster_task', side_effect=statuses_response('pending', 'running', 'success')):
+            res = self.client.wait_for('cluster_task', 1, until=['running'])
+        self.assertEqual(res['data']['status'], 'running')
+
+        with patch.object(self.client, 'get_cluster_task', side_effect=statuses_response('pending', 'running', 'success')):
+            res = self.client.wait_for('cluster_task', 1, until=lambda data: data['status'] != 'pending')
+        self.assertEqual(res['data']['status'], 'running')
+
+    def test_status_object(self):
+        with patch.object(self.client, 'get_status', side_effect=statuses_response('deploying', 'running')) as get_status:
+            res = self.client.wait_for('Project', 1, until=['running'])
+
+        self.assertEqual(res['data']['status'], 'running')
+        get_status.assert_called_with(object='Project', id=1)
+
+    def test_many_ids(self):
+        def get(id):
+            return {'data': {'id': id, 'status': 'done'}}
+
+        with patch.object(self.client, 'get_experiment_session', side_effect=get):
+            res = self.client.wait_for('experiment_session', [3, 1, 2])
+
+        self.assertEqual([item['data']['id'] for item in res], [3, 1, 2])
+
+    def test_deadline(self):
+        with patch.object(self.client, 'get_warm_start_request', return_value={'data': {'status': 'requested'}}):
+            with self.assertRaises(HubApiClient.WaitTimeoutError) as context:
+                self.client.wait_for('warm_start_request', 1, deadline=0.05)
+
+        self.assertIn('still requested', str(context.exception))
+        self.assertEqual(context.exception.metadata(), {'data': {'status': 'requested'}})
+
+
+class TestAsyncWaitFor(unittest.IsolatedAsyncioTestCase):
+    async def test_waits_for_many_ids(self):
+        client = AsyncHubApiClient(hub_app_url='http://localhost:5000', poll_backoff=ExponentialBackoff(initial=0.001))
+        polls = {}
+
+        async def get(id):
+            polls[id] = polls.get(id, 0) + 1
+            return {'data': {'id': id, 'status': 'done' if polls[id] == id else 'requested'}}
+
+        with patch.object(client, 'get_similar_trials_request', side_effect=get):
+            res = await client.wait_for('similar_trials_request', [1, 3, 2])
+
+        self.assertEqual([item['data']['id'] for item in res], [1, 3, 2])
+        self.assertEqual(polls, {1: 1, 2: 2, 3: 3})
+
+        async def get_running(id):
+            return {'data': {'id': id, 'status': 'running'}}
+
+        with patch.object(client, 'get_similar_trials_request', side_effect=get_running):
+            with self.assertRaises(HubApiClient.WaitTimeoutError):
+                await client.wait_for('similar_trials_request', 1, deadline=0.02)
+
+        await client.close()
@@ -0,0 +1,114 @@
+import datetime
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from auger.hub_api_client import AsyncHubApiClient, HubApiClient
+from auger.hub_api_client.query import encode_query, url_with_query
+from tests.session_helper import client_with_session, fake_response
+
+
+class TestEncodeQuery(unittest.TestCase):
+    def test_sorted_keys(self):
+        self.assertEqual(encode_query({'offset': 10, 'limit': 5}), 'limit=5&offset=10')
+        self.assertEqual(encode_query({'limit': 5, 'offset': 10}), encode_query({'offset': 10, 'limit': 5}))
+
+    def test_nested_params(self):
+        params = {'ids': [3, 1, 2], 'filter': {'status': 'running', 'kind': None}, 'empty': []}
+
+        self.assertEqual(
+            encode_query(params),
+            'empty%5B%5D=&filter%5Bkind%5D=&filter%5Bstatus%5D=running&ids%5B%5D=3&ids%5B%5D=1&ids%5B%5D=2'
+        )
+
+    def test_values(self):
+        params = {'active': True, 'deleted': False, 'since': datetime.date(2020, 1, 2), 'name': 'a b&c=d'}
+
+        self.assertEqual(encode_query(params), 'active=true&deleted=false&name=a%20b%26c%3Dd&since=2020-01-02')
+
+    def test_url_with_query(self):
+        self.assertEqual(url_with_query('http://hub/api/v1/trials', {}), 'http://hub/api/v1/trials')
+        self.assertEqual(url_with_query('http://hub/api/v1/trials?a=1', {'b': 2}), 'http://hub/api/v1/trials?a=1&b=2')
+
+
+class TestGetParams(unittest.TestCase):
+    def createClient(self, **config):
+        client, self.session = client_with_session(fake_response(200, {'data': {}}), **config)
+        return client
+
+    def test_body_by_default(self):
+        client = self.createClient(token='some-token')
+
+        client.get_trials(limit=5, offset=10)
+
+        args, kwargs = self.session.get.call_args
+        self.assertEqual(args[0], 'http://localhost:5000/api/v1/trials')
+        self.assertIn(b'"limit"', kwargs['data'])
+
+    def test_get_params_in_query(self):
+        client = self.createClient(token='some-token', get_params='query')
+
+        client.get_trials(offset=10, limit=5)
+
+        args, kwargs = self.session.get.call_args
+        self.assertEqual(args[0], 'http://localhost:5000/api/v1/trials?limit=5&offset=10')
+        self.assertEqual(kwargs['headers']['Authorization'], 'Token token="some-token", type="token"')
+        self.assertNotIn('data', kwargs)
+
+    def test_query_requires_header_auth(self):
+        with self.assertRaises(ValueError):
+            self.createClient(token='some-token', get_params='query', auth_mode='payload')
+
+    def test_post_keeps_body(self):
+        client = self.createClient(token='some-token', get_params='query')
+
+        client.create_trial(name='trial')
+
+        args, kwargs = self.session.post.call_args
+        self.assertEqual(args[0], 'http://localhost:5000/api/v1/trials')
+        self.assertIn(b'"name"', kwargs['data'])
+
+
+# Records paths of requests, to compare URLs sent by sync and async clients
+class PathsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        body = b'{"data": [], "meta": {"status": 200}}'
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncGetParams(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), PathsHandler)
+        self.server.paths = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.config = {
+            'hub_app_url': 'http://127.0.0.1:{}'.format(self.server.server_address[1]), 'token': 'some-token', 'get_params': 'query'
+        }
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    async def test_sync_and_async_urls_are_equal(self):
+        params = {'filter': {'status': 'running'}, 'ids': [1, 2], 'since': '2020-10-21T07:28:00Z', 'name': 'a b/c'}
+
+        with HubApiClient(**self.config) as client:
+            client.get_trials(**params)
+
+        async with AsyncHubApiClient(**self.config) as client:
+            await client.get_trials(**params)
+
+        self.assertEqual(self.server.paths[0], self.server.paths[1])
+        self.assertEqual(
+            self.server.paths[0],
+            '/api/v1/trials?filter%5Bstatus%5D=running&ids%5B%5D=1&ids%5B%5D=2&limit=50&name=a%20b%2Fc&offset=0&since=2020-10-21T07%3A28%3A00Z'
+        )
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from mock import patch
+
+from auger.hub_api_client import AdaptiveConcurrency, AsyncHubApiClient, RateLimiter
+from auger.hub_api_client.rate_limiter import TokenBucket
+from tests.clock_helper import FakeClock
+from tests.session_helper import client_with_session, fake_response
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_and_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=2, clock=clock)
+
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0, 0, 0.5, 1.0])
+
+        clock.now = 1
+        self.assertEqual(bucket.reserve(), 0.5)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_method_and_resource_limits(self):
+        clock = FakeClock()
+        limiter = RateLimiter(limits={'post': 1, 'actual': (0.5, 1)}, clock=clock)
+
+        self.assertEqual(limiter.reserve('get', 'trial'), 0)
+        self.assertEqual(limiter.reserve('get', 'trial'), 0)
+        self.assertEqual(limiter.reserve('post', 'trial'), 0)
+        self.assertEqual(limiter.reserve('post', 'actual'), 1)
+        self.assertEqual(limiter.reserve('get', 'actual'), 2)
+
+    def test_client_limits_requests(self):
+        client, session = client_with_session(fake_response(200, {'data': {}}), rate_limits={'actual': (10, 1)})
+
+        with patch('time.sleep') as sleep_mock:
+            client.create_actual(actuals=[])
+            client.create_actual(actuals=[])
+            client.create_trial(name='trial')
+
+        self.assertEqual(sleep_mock.call_count, 1)
+        self.assertAlmostEqual(sleep_mock.call_args[0][0], 0.1, places=2)
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def test_aimd(self):
+        concurrency = AdaptiveConcurrency(limit=2, min_limit=1, max_limit=3, increase=1, decrease=0.5)
+
+        for _ in range(2):
+            concurrency.acquire()
+            concurrency.release(success=True)
+        self.assertEqual(int(concurrency.limit), 2)
+        concurrency.acquire()
+        concurrency.release(success=True)
+        self.assertEqual(int(concurrency.limit), 3)
+
+        concurrency.acquire()
+        concurrency.release(success=False)
+        self.assertEqual(concurrency.limit, 1.5)
+        concurrency.acquire()
+        concurrency.release(success=False)
+        self.assertEqual(concurrency.limit, 1)
+
+        concurrency.acquire()
+        concurrency.release()
+        self.assertEqual(concurrency.limit, 1)
+
+    def test_limits_in_flight_requests(self):
+        concurrency = AdaptiveConcurrency(limit=2)
+        lock = threading.Lock()
+        in_flight = []
+        max_in_flight = []
+
+        def request(_):
+            concurrency.acquire()
+            with lock:
+                in_flight.append(1)
+                max_in_flight.append(len(in_flight))
+            threading.Event().wait(0.01)
+            with lock:
+                in_flight.pop()
+            concurrency.release()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(request, range(16)))
+
+        self.assertEqual(max(max_in_flight), 2)
+
+    @patch('time.sleep', return_value=None)
+    def test_client_cuts_concurrency_on_overload(self, sleep_mock):
+        client, session = client_with_session(adaptive_concurrency={'limit': 8})
+        session.get.side_effect = [fake_response(503, text='Service Unavailable'), fake_response(200, {'data': {}})]
+        client.get_trial(1)
+
+        self.assertEqual(client.adaptive_concurrency.limit, 4.25)
+        self.assertEqual(client.adaptive_concurrency.in_flight, 0)
+
+
+class TestAsyncAdaptiveConcurrency(unittest.IsolatedAsyncioTestCase):
+    async def test_limits_in_flight_coroutines(self):
+        client = AsyncHubApiClient(hub_app_url='http://localhost:5000', adaptive_concurrency={'limit': 2, 'max_limit': 2})
+        in_flight = []
+        max_in_flight = []
+
+        async def request(*args, **kwargs):
+            in_flight.append(1)
+            max_in_flight.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            return AsyncHubApiClient.Response(200, 'OK', b'{"data": {}}', {})
+
+        with patch.object(client, 'request', side_effect=request):
+            await asyncio.gather(*[client.get_trial(id) for id in range(10)])
+
+        self.assertEqual(max(max_in_flight), 2)
+        self.assertEqual(client.adaptive_concurrency.in_flight, 0)
+        await client.close()
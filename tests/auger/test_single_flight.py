@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from mock import patch
+
+from auger.hub_api_client import AsyncHubApiClient, HubApiClient
+from auger.hub_api_client.single_flight import AsyncSingleFlight, SingleFlight
+from tests.session_helper import client_with_session, fake_response
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.single_flight = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def slow_call(self, result=None, error=None):
+        def call():
+            self.calls += 1
+            self.started.set()
+            self.release.wait(5)
+            if error:
+                raise error
+            return result
+        return call
+
+    def run_concurrently(self, count, fn):
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            leader = executor.submit(self.single_flight.do, 'key', fn)
+            self.started.wait(5)
+            followers = [executor.submit(self.single_flight.do, 'key', fn) for _ in range(count - 1)]
+            # Let followers start waiting for the leader
+            while len([f for f in followers if f.running()]) < count - 1:
+                pass
+            self.release.set()
+            return [leader] + followers
+
+    def test_shares_result(self):
+        futures = self.run_concurrently(3, self.slow_call(result={'data': 1}))
+        results = [future.result() for future in futures]
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results[0], ({'data': 1}, False))
+        self.assertEqual(results[1:], [({'data': 1}, True)] * 2)
+        self.assertIsNot(results[1][0], results[0][0])
+        self.assertEqual(self.single_flight.calls, {})
+
+    def test_shares_error(self):
+        error = HubApiClient.RetryableApiError('Server is down')
+        futures = self.run_concurrently(3, self.slow_call(error=error))
+
+        for future in futures:
+            self.assertIs(future.exception(), error)
+        self.assertEqual(self.calls, 1)
+
+    def test_sequential_calls_are_not_shared(self):
+        self.release.set()
+        self.single_flight.do('key', self.slow_call(result=1))
+        self.single_flight.do('key', self.slow_call(result=1))
+
+        self.assertEqual(self.calls, 2)
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_shares_result_and_error(self):
+        single_flight = AsyncSingleFlight()
+        calls = []
+
+        async def call(error=None):
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            if error:
+                raise error
+            return {'data': 1}
+
+        results = await asyncio.gather(*[single_flight.do('key', call) for _ in range(3)])
+        self.assertEqual(results, [({'data': 1}, False), ({'data': 1}, True), ({'data': 1}, True)])
+
+        error = HubApiClient.NetworkError('Connection refused')
+        results = await asyncio.gather(
+            *[single_flight.do('key', lambda: call(error)) for _ in range(2)], return_exceptions=True
+        )
+        self.assertEqual(results, [error, error])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(single_flight.calls, {})
+
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        single_flight = AsyncSingleFlight()
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {'data': 1}
+
+        leader = asyncio.ensure_future(single_flight.do('key', call))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(single_flight.do('key', call))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        self.assertEqual(await follower, ({'data': 1}, True))
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(single_flight.calls, {})
+
+
+class TestHubApiClientCoalescing(unittest.TestCase):
+    def setUp(self):
+        self.client = HubApiClient(hub_app_url='http://localhost:5000', coalesce_requests=True)
+
+    def test_coalesces_identical_gets(self):
+        def request(*args, **kwargs):
+            # Keep request in flight while other threads call the same action
+            time.sleep(0.2)
+            return {'data': {'id': 1}}
+
+        with patch.object(self.client, 'request_with_retries', side_effect=request) as request_mock:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [executor.submit(self.client.get_trial, 1) for _ in range(4)]
+                futures.append(executor.submit(self.client.get_trial, 2))
+                results = [future.result() for future in futures]
+
+        self.assertEqual(results, [{'data': {'id': 1}}] * 5)
+        self.assertEqual(sorted(call[0][1] for call in request_mock.call_args_list), ['/api/v1/trials/1', '/api/v1/trials/2'])
+
+    def test_shares_not_modified_response(self):
+        client, session = client_with_session(coalesce_requests=True, conditional_requests=True)
+        body = {'data': {'object': 'cluster_task', 'id': 1, 'status': 'running'}}
+
+        def get(*args, **kwargs):
+            if session.get.call_count == 1:
+                return fake_response(200, body, {'ETag': '"1"'})
+
+            time.sleep(0.2)
+            return fake_response(304)
+
+        session.get.side_effect = get
+        client.get_cluster_task(1)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: client.get_cluster_task(1), range(4)))
+
+        self.assertEqual(results, [body] * 4)
+        self.assertEqual(session.get.call_count, 2)
+
+    def test_does_not_coalesce_writes(self):
+        with patch.object(self.client, 'request_with_retries', return_value={'data': {}}) as request_mock:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(lambda _: self.client.update_trial(1, name='x'), range(2)))
+
+        self.assertEqual(request_mock.call_count, 2)
+
+
+class TestAsyncHubApiClientCoalescing(unittest.IsolatedAsyncioTestCase):
+    async def test_coalesces_identical_gets(self):
+        client = AsyncHubApiClient(hub_app_url='http://localhost:5000', coalesce_requests=True)
+        paths = []
+
+        async def request(method_name, path, *args, **kwargs):
+            paths.append(path)
+            await asyncio.sleep(0.01)
+            return {'data': {'id': 1}}
+
+        with patch.object(client, 'request_with_retries', side_effect=request):
+            results = await asyncio.gather(*[client.get_trial(1) for _ in range(3)])
+
+        self.assertEqual(results, [{'data': {'id': 1}}] * 3)
+        self.assertEqual(paths, ['/api/v1/trials/1'])
+        await client.close()
+
+    async def test_validators_of_concurrent_coalesced_requests(self):
+        client = AsyncHubApiClient(hub_app_url='http://localhost:5000', coalesce_requests=True, conditional_requests=True)
+
+        async def request(method_name, path, *args):
+            id = path.split('/')[-1]
+            await asyncio.sleep(0.01)
+            body = '{{"data": {{"object": "cluster_task", "id": {id}}}}}'.format(id=id).encode('utf-8')
+            return client.Response(200, 'OK', body, {'ETag': '"{}"'.format(id)})
+
+        with patch.object(client, 'request', side_effect=request):
+            await asyncio.gather(client.get_cluster_task(1), client.get_cluster_task(2))
+
+        for id in [1, 2]:
+            key = client.validators.key('cluster_task', client.base_url, '/api/v1/cluster_tasks/{}'.format(id), {})
+            self.assertEqual(client.validators.get(key)['etag'], '"{}"'.format(id))
+
+        await client.close()
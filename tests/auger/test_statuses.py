@@ -0,0 +1,149 @@
+import unittest
+from mock import patch
+
+from auger.hub_api_client import AsyncHubApiClient, HubApiClient
+
+
+class TestGetStatuses(unittest.TestCase):
+    def setUp(self):
+        self.client = HubApiClient(hub_app_url='http://localhost:5000', status_batch_size=2)
+        self.statuses = {('Pipeline', 1): 'packaging', ('Pipeline', 2): 'ready', ('Pipeline', 3): 'ready', ('ClusterTask', 25): 'running'}
+        self.requests = []
+
+    def request(self, multi_id):
+        def make_and_handle_request(method_name, path, payload={}, **kwargs):
+            self.requests.append(payload)
+
+            if 'ids' in payload:
+                if not multi_id:
+                    raise HubApiClient.InvalidParamsError('Invalid params', {'errors': [{'error_param': 'id'}]})
+                return {'data': [{'id': id, 'status': self.statuses[(payload['object'], id)]} for id in payload['ids']]}
+
+            return {'data': {'status': self.statuses[(payload['object'], payload['id'])]}}
+
+        return patch.object(self.client, 'make_and_handle_request', side_effect=make_and_handle_request)
+
+    def test_multi_id_requests(self):
+        with self.request(multi_id=True):
+            res = self.client.get_statuses([('Pipeline', 1), ('Pipeline', 2), ('ClusterTask', 25), ('Pipeline', 3), ('Pipeline', 1)])
+
+        self.assertEqual(res, self.statuses)
+        self.assertEqual(self.requests, [
+            {'object': 'Pipeline', 'ids': [1, 2]},
+            {'object': 'Pipeline', 'ids': [3]},
+            {'object': 'ClusterTask', 'ids': [25]},
+        ])
+
+    def test_fallback_to_single_requests(self):
+        with self.request(multi_id=False):
+            self.assertEqual(self.client.get_statuses(self.statuses.keys()), self.statuses)
+            self.requests = []
+            self.assertEqual(self.client.get_statuses([('Pipeline', 2)]), {('Pipeline', 2): 'ready'})
+
+        self.assertEqual(self.client.multi_status_support, {'Pipeline': False, 'ClusterTask': False})
+        self.assertEqual(self.requests, [{'object': 'Pipeline', 'id': 2}])
+
+    def test_single_request_errors(self):
+        del self.statuses[('Pipeline', 3)]
+        errors = {}
+
+        with self.request(multi_id=False):
+            with patch.object(self.client, 'get_status', side_effect=self.get_status):
+                res = self.client.get_statuses([('Pipeline', 1), ('Pipeline', 3), ('Pipeline', 2)], errors=errors)
+
+        self.assertEqual(res, {('Pipeline', 1): 'packaging', ('Pipeline', 2): 'ready'})
+        self.assertEqual(list(errors), [('Pipeline', 3)])
+        self.assertIsInstance(errors[('Pipeline', 3)], HubApiClient.FatalApiError)
+
+    def test_single_request_errors_are_raised_without_errors_dict(self):
+        def get_status(object, id):
+            raise HubApiClient.FatalApiError('status: 401', {}, status_code=401)
+
+        with self.request(multi_id=False):
+            with patch.object(self.client, 'get_status', side_effect=get_status):
+                with self.assertRaises(HubApiClient.FatalApiError):
+                    self.client.get_statuses([('Pipeline', 1), ('Pipeline', 2)])
+
+                with self.assertRaises(HubApiClient.FatalApiError):
+                    self.client.get_status_changes([('Pipeline', 1)])
+
+        self.assertEqual(self.client.last_statuses, {})
+
+    def test_fallback_on_not_found_multi_id_request(self):
+        for status_code in [404, 405]:
+            self.client.multi_status_support = {}
+
+            def make_and_handle_request(method_name, path, payload={}, **kwargs):
+                if 'ids' in payload:
+                    raise HubApiClient.FatalApiError('status: {}'.format(status_code), {}, status_code=status_code)
+                return {'data': {'status': self.statuses[(payload['object'], payload['id'])]}}
+
+            with patch.object(self.client, 'make_and_handle_request', side_effect=make_and_handle_request):
+                self.assertEqual(self.client.get_statuses([('Pipeline', 1), ('Pipeline', 2)]), {('Pipeline', 1): 'packaging', ('Pipeline', 2): 'ready'})
+
+            self.assertEqual(self.client.multi_status_support, {'Pipeline': False})
+
+    def test_multi_id_request_errors_are_raised(self):
+        def make_and_handle_request(method_name, path, payload={}, **kwargs):
+            raise HubApiClient.FatalApiError('status: 401', {}, status_code=401)
+
+        with patch.object(self.client, 'make_and_handle_request', side_effect=make_and_handle_request):
+            with self.assertRaises(HubApiClient.FatalApiError):
+                self.client.get_statuses([('Pipeline', 1)])
+
+        self.assertEqual(self.client.multi_status_support, {})
+
+    def get_status(self, object, id):
+        if (object, id) not in self.statuses:
+            raise HubApiClient.FatalApiError('status: 404', {}, status_code=404)
+
+        return {'data': {'status': self.statuses[(object, id)]}}
+
+    def test_status_changes(self):
+        objects = [('Pipeline', 1), ('Pipeline', 2)]
+
+        with self.request(multi_id=True):
+            self.assertEqual(self.client.get_status_changes(objects), [('Pipeline', 1, None, 'packaging'), ('Pipeline', 2, None, 'ready')])
+            self.assertEqual(self.client.get_status_changes(objects), [])
+
+            self.statuses[('Pipeline', 1)] = 'ready'
+            self.assertEqual(self.client.get_status_changes(objects), [('Pipeline', 1, 'packaging', 'ready')])
+
+
+class TestAsyncGetStatuses(unittest.IsolatedAsyncioTestCase):
+    async def test_fallback_to_single_requests(self):
+        client = AsyncHubApiClient(hub_app_url='http://localhost:5000')
+
+        async def make_and_handle_request(method_name, path, payload={}, **kwargs):
+            if 'ids' in payload:
+                return {'data': {'status': 'ready'}}
+            return {'data': {'status': 'ready' if payload['id'] == 1 else 'packaging'}}
+
+        with patch.object(client, 'make_and_handle_request', side_effect=make_and_handle_request):
+            changes = await client.get_status_changes([('Pipeline', 1), ('Pipeline', 2)])
+
+        self.assertEqual(changes, [('Pipeline', 1, None, 'ready'), ('Pipeline', 2, None, 'packaging')])
+        self.assertEqual(client.multi_status_support, {'Pipeline': False})
+        await client.close()
+
+    async def test_fallback_on_not_found_multi_id_request(self):
+        client = AsyncHubApiClient(hub_app_url='http://localhost:5000')
+
+        async def make_and_handle_request(method_name, path, payload={}, **kwargs):
+            if 'ids' in payload:
+                raise HubApiClient.FatalApiError('status: 404', {}, status_code=404)
+            if payload['id'] == 2:
+                raise HubApiClient.FatalApiError('status: 401', {}, status_code=401)
+            return {'data': {'status': 'ready'}}
+
+        with patch.object(client, 'make_and_handle_request', side_effect=make_and_handle_request):
+            with self.assertRaises(HubApiClient.FatalApiError):
+                await client.get_statuses([('Pipeline', 1), ('Pipeline', 2)])
+
+            errors = {}
+            statuses = await client.get_statuses([('Pipeline', 1), ('Pipeline', 2)], errors=errors)
+
+        self.assertEqual(statuses, {('Pipeline', 1): 'ready'})
+        self.assertEqual(list(errors), [('Pipeline', 2)])
+        self.assertEqual(client.multi_status_support, {'Pipeline': False})
+        await client.close()
@@ -0,0 +1,94 @@
+import json
+import numpy
+import pandas
+import unittest
+from mock import patch
+
+from auger.hub_api_client import tabular
+from auger.hub_api_client.tabular import is_tabular, iter_tabular_records, tabular_records
+from tests.session_helper import client_with_session, fake_response
+
+
+class TestTabularRecords(unittest.TestCase):
+    def test_plain_records_are_not_tabular(self):
+        self.assertFalse(is_tabular([[1.1, 1.2]]))
+        self.assertFalse(is_tabular(None))
+
+    def test_data_frame(self):
+        frame = pandas.DataFrame({
+            'x1': [1.1, float('nan')],
+            'x2': ['a', None],
+            'at': pandas.to_datetime(['2020-10-21', None]),
+        })
+
+        features, records = tabular_records(frame)
+
+        self.assertEqual(features, ['x1', 'x2', 'at'])
+        self.assertEqual(records[0][:2], [1.1, 'a'])
+        self.assertEqual(records[1], [None, None, None])
+        self.assertEqual(tabular_records(frame, features=['a', 'b', 'c'])[0], ['a', 'b', 'c'])
+
+    def test_structured_array(self):
+        array = numpy.array([(1.1, 2, 'a'), (numpy.nan, 3, 'b')], dtype=[('x1', 'f8'), ('x2', 'i4'), ('x3', 'U1')])
+
+        self.assertEqual(tabular_records(array), (['x1', 'x2', 'x3'], [[1.1, 2, 'a'], [None, 3, 'b']]))
+
+    def test_plain_array(self):
+        array = numpy.array([[1.1, numpy.nan], [numpy.nan, 2.2]])
+
+        self.assertEqual(tabular_records(array, ['x1', 'x2']), (['x1', 'x2'], [[1.1, None], [None, 2.2]]))
+
+    def test_iter_records_by_slices(self):
+        frame = pandas.DataFrame({'x1': [1.1, float('nan'), 3.1, 4.1, 5.1], 'x2': ['a', 'b', None, 'd', 'e']})
+        array = numpy.array([(1.1, 2), (numpy.nan, 3), (3.3, 4)], dtype=[('x1', 'f8'), ('x2', 'i4')])
+
+        for value, slice_sizes in [(frame, [2, 2, 1]), (array, [2, 1])]:
+            expected = tabular_records(value)
+
+            with patch.object(tabular, 'tabular_records', wraps=tabular_records) as convert:
+                features, rows = iter_tabular_records(value, slice_rows=2)
+                convert.assert_not_called()
+
+                self.assertEqual((features, list(rows)), expected)
+                self.assertEqual([len(call[0][0]) for call in convert.call_args_list], slice_sizes)
+
+
+class TestCreatePredictionWithDataFrame(unittest.TestCase):
+    def setUp(self):
+        self.client, self.session = client_with_session(fake_response(200, {'data': {'object': 'prediction'}}))
+        self.frame = pandas.DataFrame({'x1': [1.1, 2.1], 'x2': [1.2, float('nan')]})
+
+    def sent_payload(self):
+        return json.loads(self.session.post.call_args[1]['data'])
+
+    def test_create_prediction(self):
+        self.client.create_prediction(pipeline_id='46188658d308607a', records=self.frame)
+
+        self.assertEqual(self.sent_payload(), {
+            'pipeline_id': '46188658d308607a', 'features': ['x1', 'x2'], 'records': [[1.1, 1.2], [2.1, None]]
+        })
+
+    def test_create_endpoint_prediction(self):
+        self.client.create_endpoint_prediction(endpoint_id='ddc968ac', records=self.frame, features=['a', 'b'])
+
+        self.assertEqual(self.sent_payload()['features'], ['a', 'b'])
+        self.assertIn('/endpoints/ddc968ac/predictions', self.session.post.call_args[0][0])
+
+    def test_bulk_create_predictions(self):
+        results = self.client.bulk_create_predictions('46188658d308607a', self.frame, chunk_rows=1)
+
+        self.assertEqual(len(results), 2)
+        payloads = [json.loads(call[1]['data']) for call in self.session.post.call_args_list]
+        self.assertEqual(sorted(payload['records'] for payload in payloads), [[[1.1, 1.2]], [[2.1, None]]])
+        self.assertEqual(payloads[0]['features'], ['x1', 'x2'])
+
+    def test_bulk_create_predictions_converts_frame_by_chunks(self):
+        frame = pandas.DataFrame({'x1': [float(id) for id in range(5)]})
+
+        with patch.object(tabular, 'tabular_records', wraps=tabular_records) as convert:
+            results = self.client.bulk_create_predictions('46188658d308607a', frame, chunk_rows=2, max_in_flight=1)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual([len(call[0][0]) for call in convert.call_args_list], [2, 2, 1])
+        payloads = [json.loads(call[1]['data']) for call in self.session.post.call_args_list]
+        self.assertEqual([payload['records'] for payload in payloads], [[[0.0], [1.0]], [[2.0], [3.0]], [[4.0]]])
@@ -0,0 +1,7 @@
+# Clock for time dependent classes (their `clock` argument), tests move time by setting `now`
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,27 @@
+import json
+from mock import MagicMock
+
+from auger.hub_api_client import HubApiClient
+
+
+# Response of mocked requests session, body is encoded to JSON unless it is bytes
+def fake_response(status_code=200, body=b'', headers=None, text=None):
+    content = body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+    res = MagicMock(
+        status_code=status_code, headers=headers or {}, content=content,
+        text=content.decode('utf-8') if text is None else text, reason=''
+    )
+    res.__enter__.return_value = res
+    return res
+
+
+# Returns (client, session), client uses mocked session for all base urls,
+# `response` (if given) is returned by session.get and session.post
+def client_with_session(response=None, **config):
+    session = MagicMock()
+    if response is not None:
+        session.get.return_value = response
+        session.post.return_value = response
+
+    config.setdefault('hub_app_url', 'http://localhost:5000')
+    return HubApiClient(session_factory=lambda base_url: session, **config), session